@@ -0,0 +1,104 @@
+import math
+import os
+import threading
+import time
+
+# /detections/ 입구의 부하 제어.
+#  - 감지 서버(ai_server_id)마다 토큰 버킷: 일반 이벤트와 화재/연기 이벤트는 버킷을 따로 쓴다
+#  - 워커 전체의 처리 중(in-flight) 요청 수 상한: 일반 이벤트는 ROUTINE_IN_FLIGHT_SHARE 까지만 차지할 수 있어서
+#    과부하 때도 남은 자리는 화재/연기 이벤트가 쓴다
+# 거절할 때는 Retry-After 초를 같이 돌려준다. 카운터와 버킷은 워커 프로세스별이다.
+
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "5"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "10"))
+PRIORITY_RATE = float(os.getenv("ADMISSION_PRIORITY_RATE", "20"))
+PRIORITY_BURST = float(os.getenv("ADMISSION_PRIORITY_BURST", "40"))
+MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+ROUTINE_IN_FLIGHT_SHARE = 0.75
+OVERLOAD_RETRY_AFTER = 1
+IDLE_SOURCE_SECONDS = 600
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """토큰 하나를 쓴다. 성공하면 0, 실패하면 다음 토큰까지 기다릴 초를 돌려준다."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class SourceState:
+    def __init__(self):
+        self.routine = TokenBucket(ADMISSION_RATE, ADMISSION_BURST)
+        self.priority = TokenBucket(PRIORITY_RATE, PRIORITY_BURST)
+        self.counters = {
+            "accepted": 0,
+            "accepted_priority": 0,
+            "rejected_rate": 0,
+            "rejected_overload": 0,
+        }
+        self.last_seen = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT):
+        self.lock = threading.Lock()
+        self.max_in_flight = max_in_flight
+        self.routine_in_flight = max(1, int(max_in_flight * ROUTINE_IN_FLIGHT_SHARE))
+        self.in_flight = 0
+        self.sources = {}
+
+    def admit(self, source, priority=False):
+        """(허용 여부, Retry-After 초). 허용되면 처리가 끝난 뒤 release()를 꼭 불러야 한다."""
+        now = time.monotonic()
+        with self.lock:
+            state = self.sources.get(source)
+            if state is None:
+                self.prune(now)
+                state = self.sources[source] = SourceState()
+            state.last_seen = now
+
+            limit = self.max_in_flight if priority else self.routine_in_flight
+            if self.in_flight >= limit:
+                state.counters["rejected_overload"] += 1
+                return False, OVERLOAD_RETRY_AFTER
+
+            wait = (state.priority if priority else state.routine).take(now)
+            if wait > 0:
+                state.counters["rejected_rate"] += 1
+                return False, max(1, math.ceil(wait))
+
+            self.in_flight += 1
+            state.counters["accepted_priority" if priority else "accepted"] += 1
+            return True, 0
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def prune(self, now):
+        # 한동안 보내지 않은 감지 서버는 버킷을 지워서, 서버 ID가 계속 바뀌어도 메모리가 늘지 않게 한다
+        idle = [source for source, state in self.sources.items() if now - state.last_seen > IDLE_SOURCE_SECONDS]
+        for source in idle:
+            del self.sources[source]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "routine_in_flight_limit": self.routine_in_flight,
+                "sources": {source: dict(state.counters) for source, state in self.sources.items()},
+            }
+
+
+admission = AdmissionController()
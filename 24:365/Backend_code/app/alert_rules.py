@@ -0,0 +1,174 @@
+import heapq
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# 감지 스트림 위에서 바로 평가하는 선언형 경보 규칙.
+# 이벤트 하나당 규칙별로 O(1) 상태 갱신만 하고, DB를 다시 조회하지 않는다.
+#
+#   k_of_n:       같은 카메라의 최근 n개 이벤트 중 k개 이상이 조건에 맞으면 경보
+#   multi_camera: window초 안에 조건에 맞는 카메라가 cameras대 이상이면 경보
+#
+# ALERT_RULES 파일(JSON 목록)이 있으면 그 규칙을, 없으면 DEFAULT_RULES를 쓴다.
+# 규칙은 서버 lifespan에서 읽고, 필드가 빠졌거나 값이 잘못된 규칙은 경고만 남기고 건너뛴다.
+
+ALERT_RULES_PATH = os.getenv("ALERT_RULES", "alert_rules.json")
+DEFAULT_COOLDOWN = 60
+
+DEFAULT_RULES = [
+    {"name": "fire_confirmed", "type": "k_of_n", "class_name": "FIRE", "min_confidence": 0.8,
+     "k": 3, "n": 5, "severity": "critical"},
+    {"name": "smoke_multi_camera", "type": "multi_camera", "class_name": "SMOKE", "min_confidence": 0.5,
+     "cameras": 2, "window": 60, "severity": "warning"},
+]
+
+
+def event_camera(event: dict):
+    return str(event.get("camera_id") or event.get("ai_server_id") or "default")
+
+
+def event_time(event: dict):
+    try:
+        return datetime.fromisoformat(event["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+class Rule:
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.name = spec["name"]
+        self.class_name = str(spec.get("class_name", "FIRE")).upper()
+        self.min_confidence = float(spec.get("min_confidence", 0.0))
+        self.cooldown = float(spec.get("cooldown", DEFAULT_COOLDOWN))
+
+    def matches(self, event: dict):
+        return (str(event.get("class_name", "")).upper() == self.class_name
+                and float(event.get("confidence") or 0.0) >= self.min_confidence)
+
+    def alert(self, event: dict, key, **details):
+        return {
+            "type": "alert",
+            "rule": self.name,
+            "key": key,
+            "severity": self.spec.get("severity", "warning"),
+            "class_name": self.class_name,
+            "seq": event.get("seq"),
+            "timestamp": datetime.now().isoformat(),
+            **details,
+        }
+
+
+class KOfNRule(Rule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.k = int(spec["k"])
+        self.n = int(spec["n"])
+        if not 1 <= self.k <= self.n:
+            raise ValueError(f"k_of_n 규칙은 1 <= k <= n 이어야 합니다 (k={self.k}, n={self.n})")
+        self.windows = {}
+
+    def evaluate(self, event: dict):
+        camera_id = event_camera(event)
+        state = self.windows.get(camera_id)
+        if state is None:
+            state = self.windows[camera_id] = [deque(maxlen=self.n), 0]
+        window, count = state
+
+        # 가득 찬 창에서 밀려나는 값만 빼고 새 값을 더해서 개수를 유지한다
+        if len(window) == self.n:
+            count -= window[0]
+        hit = 1 if self.matches(event) else 0
+        window.append(hit)
+        count += hit
+        state[1] = count
+
+        if hit and count >= self.k:
+            return self.alert(event, camera_id, camera_id=camera_id, count=count, k=self.k, n=self.n)
+        return None
+
+
+class MultiCameraRule(Rule):
+    def __init__(self, spec: dict):
+        super().__init__(spec)
+        self.cameras = int(spec["cameras"])
+        self.window = float(spec["window"])
+        if self.cameras < 1 or self.window <= 0:
+            raise ValueError("multi_camera 규칙은 cameras >= 1, window > 0 이어야 합니다")
+        self.last_seen = {}  # camera_id -> 마지막으로 조건에 맞은 시각
+        self.hits = []  # (시각, camera_id) 최소 힙: 가장 오래된 감지부터 꺼낸다
+        self.newest = None
+
+    def evaluate(self, event: dict):
+        if not self.matches(event):
+            return None
+
+        now = event_time(event)
+        camera_id = event_camera(event)
+        self.last_seen[camera_id] = max(now, self.last_seen.get(camera_id, now))
+        self.newest = now if self.newest is None else max(self.newest, now)
+        heapq.heappush(self.hits, (now, camera_id))
+
+        # 카메라마다 시계가 다르거나 이벤트가 늦게 도착하면 도착 순서와 시각 순서가 다르므로 deque 대신 힙을 쓴다.
+        # 가장 최근 시각 기준으로 창 밖이 된 감지만 앞에서부터 꺼내므로 이벤트당 O(log 감지 수)이다.
+        # 그 카메라에 더 최근 감지가 있으면 last_seen은 그대로 둔다
+        cutoff = self.newest - self.window
+        while self.hits and self.hits[0][0] < cutoff:
+            seen_at, stale_camera = heapq.heappop(self.hits)
+            if self.last_seen.get(stale_camera) == seen_at:
+                del self.last_seen[stale_camera]
+
+        if camera_id in self.last_seen and len(self.last_seen) >= self.cameras:
+            cameras = sorted(self.last_seen, key=self.last_seen.get)
+            return self.alert(event, self.class_name, cameras=cameras, window=self.window)
+        return None
+
+
+RULE_TYPES = {
+    "k_of_n": KOfNRule,
+    "multi_camera": MultiCameraRule,
+}
+
+
+def load_rules(path=ALERT_RULES_PATH):
+    specs = DEFAULT_RULES
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            specs = json.load(f)
+
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: 경보 규칙은 JSON 목록이어야 합니다.")
+
+    rules = []
+    for spec in specs:
+        rule_type = RULE_TYPES.get(spec.get("type")) if isinstance(spec, dict) else None
+        if rule_type is None:
+            print(f"⚠️ 알 수 없는 경보 규칙 형식입니다: {spec}")
+            continue
+        try:
+            rules.append(rule_type(spec))
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"⚠️ 잘못된 경보 규칙을 건너뜁니다 ({e!r}): {spec}")
+    return rules
+
+
+class AlertEngine:
+    def __init__(self, rules=None):
+        self.rules = [] if rules is None else rules
+        self.lock = threading.Lock()
+
+    def load(self, path=ALERT_RULES_PATH):
+        rules = load_rules(path)
+        with self.lock:
+            self.rules = rules
+        return len(rules)
+
+    def evaluate(self, event: dict):
+        """감지 이벤트 하나를 모든 규칙에 넣고, 조건을 만족한 (규칙, 경보) 목록을 돌려준다."""
+        with self.lock:
+            rules = self.rules
+            alerts = [rule.evaluate(event) for rule in rules]
+        return [(rule, alert) for rule, alert in zip(rules, alerts) if alert is not None]
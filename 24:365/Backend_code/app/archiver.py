@@ -0,0 +1,207 @@
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 오래된 detection 행을 날짜별 Parquet 파일로 옮기는 보관 계층.
+#   archive/date=2025-03-14/part-<첫 id>-<마지막 id>.parquet
+# MySQL 테이블에는 최근 데이터만 남기고, 과거 데이터는 컬럼 단위로 압축된 파일에서 조회한다.
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", "3600"))
+# 실패하면 한 주기를 다 기다리지 않고 이 간격으로 다시 시도한다 (그동안은 MySQL 행 수 제한을 직접 지킨다)
+ARCHIVE_RETRY_INTERVAL = int(os.getenv("ARCHIVE_RETRY_INTERVAL", "60"))
+ARCHIVE_BATCH_SIZE = 10000
+ARCHIVE_DELETE_CHUNK = 1000
+ARCHIVE_COMPRESSION = "zstd"
+ARCHIVE_ENABLED = pa is not None
+
+if ARCHIVE_ENABLED:
+    ARCHIVE_SCHEMA = pa.schema([
+        ("id", pa.int64()),
+        ("timestamp", pa.timestamp("us")),
+        ("ai_server_id", pa.string()),
+        ("class_name", pa.string()),
+        ("confidence", pa.float32()),
+        ("is_fire_detected", pa.bool_()),
+        ("is_smoke_detected", pa.bool_()),
+        ("location_x", pa.float32()),
+        ("location_y", pa.float32()),
+        ("box_width", pa.float32()),
+        ("box_height", pa.float32()),
+        ("clip_id", pa.string()),
+        ("snapshot_hash", pa.string()),
+    ])
+    ARCHIVE_COLUMNS = ARCHIVE_SCHEMA.names
+else:
+    ARCHIVE_COLUMNS = []
+
+FLOAT_COLUMNS = ("confidence", "location_x", "location_y", "box_width", "box_height")
+BOOL_COLUMNS = ("is_fire_detected", "is_smoke_detected")
+
+
+def normalize_row(row: dict):
+    for column in FLOAT_COLUMNS:
+        if row.get(column) is not None:
+            row[column] = float(row[column])
+    for column in BOOL_COLUMNS:
+        if row.get(column) is not None:
+            row[column] = bool(row[column])
+    return row
+
+
+def write_partition(day: str, rows: list, archive_dir=ARCHIVE_DIR):
+    """rows(같은 날짜의 행 목록)를 archive_dir/date=<day>/ 아래 Parquet 파일 하나로 쓴다."""
+    partition_dir = os.path.join(archive_dir, f"date={day}")
+    os.makedirs(partition_dir, exist_ok=True)
+
+    columns = {name: [row.get(name) for row in rows] for name in ARCHIVE_COLUMNS}
+    table = pa.Table.from_pydict(columns, schema=ARCHIVE_SCHEMA)
+
+    first_id, last_id = rows[0].get("id"), rows[-1].get("id")
+    path = os.path.join(partition_dir, f"part-{first_id}-{last_id}.parquet")
+    # '.'으로 시작하는 파일은 pyarrow가 읽지 않으므로, 쓰는 중인 파일이 조회에 섞이지 않는다
+    tmp_path = os.path.join(partition_dir, f".part-{first_id}-{last_id}.tmp")
+    pq.write_table(table, tmp_path, compression=ARCHIVE_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_once(cnx, table_name, max_rows):
+    """보관 대상(ARCHIVE_AFTER_DAYS보다 오래됐거나 최근 max_rows개 밖의 행)을 한 배치 옮긴다.
+
+    옮긴 행 수를 돌려준다. 파일을 다 쓴 뒤에만 MySQL에서 지운다.
+    """
+    cursor = cnx.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT MAX(id) AS max_id FROM {table_name}")
+        max_id = cursor.fetchone()["max_id"] or 0
+        cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+        cursor.execute(
+            f"""
+            SELECT {", ".join(ARCHIVE_COLUMNS)} FROM {table_name}
+            WHERE timestamp < %s OR id <= %s
+            ORDER BY id ASC
+            LIMIT {ARCHIVE_BATCH_SIZE}
+            """,
+            (cutoff, max_id - max_rows),
+        )
+        rows = [normalize_row(row) for row in cursor.fetchall()]
+        if not rows:
+            return 0
+
+        by_day = {}
+        for row in rows:
+            by_day.setdefault(row["timestamp"].date().isoformat(), []).append(row)
+        for day, day_rows in by_day.items():
+            write_partition(day, day_rows)
+
+        ids = [row["id"] for row in rows]
+        for i in range(0, len(ids), ARCHIVE_DELETE_CHUNK):
+            chunk = ids[i:i + ARCHIVE_DELETE_CHUNK]
+            cursor.execute(f"DELETE FROM {table_name} WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        cnx.commit()
+
+        print(f"🗄️ {len(rows)}개 감지 기록을 {len(by_day)}개 날짜 파티션으로 보관했습니다.")
+        return len(rows)
+    except Exception:
+        cnx.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def run_archiver(create_connection, table_name, max_rows, stop_event):
+    global last_archive_error
+    while not stop_event.is_set():
+        cnx = create_connection()
+        if not cnx:
+            last_archive_error = "database connection failed"
+        else:
+            try:
+                while archive_once(cnx, table_name, max_rows) == ARCHIVE_BATCH_SIZE:
+                    pass
+                last_archive_error = None
+            except Exception as e:
+                last_archive_error = str(e)
+                print(f"ERROR: 감지 기록 보관 오류: {e}")
+            finally:
+                cnx.close()
+        stop_event.wait(ARCHIVE_INTERVAL if last_archive_error is None else ARCHIVE_RETRY_INTERVAL)
+
+
+archiver_stop = threading.Event()
+archiver_thread = None
+last_archive_error = None
+
+
+def archiving_active():
+    """보관 스레드가 돌고 있고 마지막 실행이 성공했으면 True. 아니면 MySQL 행 수 제한을 직접 지켜야 한다."""
+    return archiver_thread is not None and archiver_thread.is_alive() and last_archive_error is None
+
+
+def start_archiver(create_connection, table_name, max_rows):
+    if not ARCHIVE_ENABLED:
+        print("INFO: pyarrow가 없어 감지 기록 보관 기능을 끕니다.")
+        return None
+
+    global archiver_thread
+    archiver_thread = threading.Thread(
+        target=run_archiver,
+        args=(create_connection, table_name, max_rows, archiver_stop),
+        daemon=True,
+    )
+    archiver_thread.start()
+    return True
+
+
+def query_archive(start: date, end: date, columns=None, class_name=None, ai_server_id=None, limit=1000,
+                  archive_dir=ARCHIVE_DIR):
+    """[start, end] 기간의 보관 기록을 시각 순서대로 최대 limit개 읽는다.
+
+    날짜 파티션을 오래된 날부터 하나씩 읽고 limit개가 모이면 나머지 날짜는 열지 않는다.
+    파일은 memory map으로 열고, 필요한 컬럼만 읽으며, row group 통계로 조건에 맞지 않는 부분은 건너뛴다.
+    """
+    if not os.path.isdir(archive_dir) or limit <= 0:
+        return []
+
+    columns = [c for c in (columns or ARCHIVE_COLUMNS) if c in ARCHIVE_COLUMNS]
+    # 정렬하려면 timestamp가 필요하다. 요청하지 않았으면 읽은 뒤 뺀다
+    read_columns = columns if "timestamp" in columns else columns + ["timestamp"]
+
+    filters = []
+    if class_name:
+        filters.append(("class_name", "=", class_name.upper()))
+    if ai_server_id:
+        filters.append(("ai_server_id", "=", ai_server_id))
+
+    # 파티션 이름(date=YYYY-MM-DD)은 사전순이 곧 날짜순이다
+    days = sorted(
+        name for name in os.listdir(archive_dir)
+        if name.startswith("date=") and start.isoformat() <= name[len("date="):] <= end.isoformat()
+    )
+
+    rows = []
+    for day in days:
+        table = pq.read_table(
+            os.path.join(archive_dir, day),
+            columns=read_columns,
+            filters=filters or None,
+            memory_map=True,
+        )
+        table = table.sort_by("timestamp").slice(0, limit - len(rows)).select(columns)
+        rows.extend(table.to_pylist())
+        if len(rows) >= limit:
+            break
+
+    for row in rows:
+        if isinstance(row.get("timestamp"), datetime):
+            row["timestamp"] = row["timestamp"].isoformat()
+    return rows
@@ -0,0 +1,169 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 대시보드 정적 파일 파이프라인
+#  - 시작할 때 Frontend_code의 파일마다 내용 해시가 붙은 이름(home.3fa2b1c4d5e6.css)과 gzip/brotli 변형을 만든다.
+#  - 해시 이름은 내용이 바뀌면 이름도 바뀌므로 immutable 캐시로 내보낸다.
+#  - HTML은 메모리에 두고 요청마다 mtime만 확인해서 바뀌었을 때만 다시 읽는다.
+
+FRONTEND_DIR = os.getenv(
+    "FRONTEND_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "Frontend_code")),
+)
+ASSET_URL_PREFIX = "/assets/"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 512
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+ASSET_REF_PATTERN = re.compile(r'(href|src)="([^"#?:]+)"')
+
+
+class Asset:
+    def __init__(self, name, content, content_type):
+        self.name = name
+        self.content_type = content_type
+        self.digest = hashlib.sha256(content).hexdigest()
+        self.etag_base = self.digest[:16]
+
+        base, ext = os.path.splitext(name)
+        self.hashed_name = f"{base}.{self.digest[:12]}{ext}"
+
+        self.variants = {"identity": content}
+        if content_type.startswith(COMPRESSIBLE_TYPES) and len(content) >= MIN_COMPRESS_SIZE:
+            gz = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gz) < len(content):
+                self.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(content, quality=11)
+                if len(br) < len(content):
+                    self.variants["br"] = br
+
+    def etag(self, encoding):
+        # 같은 내용이라도 인코딩별로 바이트가 다르므로 strong ETag도 인코딩별로 구분한다
+        return f'"{self.etag_base}-{encoding}"'
+
+    def matches(self, if_none_match, encoding):
+        """If-None-Match가 이번 응답에 쓸 인코딩의 ETag와 같을 때만 True (gzip ETag로 br 응답을 검증하지 않는다)."""
+        etag = self.etag(encoding)
+        return any(tag == "*" or tag.removeprefix("W/") == etag
+                   for tag in (tag.strip() for tag in if_none_match.split(",")))
+
+    def select(self, accept_encoding: str):
+        accepted = {token.split(";")[0].strip() for token in (accept_encoding or "").lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding, self.variants[encoding]
+        return "identity", self.variants["identity"]
+
+
+class HtmlPage:
+    def __init__(self, path):
+        self.path = path
+        self.stat_key = None
+        self.asset = None
+
+
+assets = {}
+assets_by_hash = {}
+html_pages = {}
+lock = threading.Lock()
+
+
+def guess_type(name):
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if content_type.startswith("text/"):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def build_assets(frontend_dir=FRONTEND_DIR):
+    new_assets = {}
+    for name in sorted(os.listdir(frontend_dir)):
+        path = os.path.join(frontend_dir, name)
+        if not os.path.isfile(path) or name.startswith(".") or name.endswith(".html"):
+            continue
+        with open(path, "rb") as f:
+            new_assets[name] = Asset(name, f.read(), guess_type(name))
+
+    with lock:
+        assets.clear()
+        assets.update(new_assets)
+        assets_by_hash.clear()
+        assets_by_hash.update({asset.hashed_name: asset for asset in new_assets.values()})
+        html_pages.clear()
+
+    total = sum(len(a.variants["identity"]) for a in new_assets.values())
+    print(f"✅ 정적 파일 {len(new_assets)}개 준비 완료 ({total // 1024} KB, brotli: {'on' if brotli else 'off'})")
+    return len(new_assets)
+
+
+def rewrite_asset_refs(html: str):
+    def replace(match):
+        asset = assets.get(match.group(2))
+        if asset is None:
+            return match.group(0)
+        return f'{match.group(1)}="{ASSET_URL_PREFIX}{asset.hashed_name}"'
+
+    return ASSET_REF_PATTERN.sub(replace, html)
+
+
+def get_html(name, frontend_dir=FRONTEND_DIR):
+    """메모리에 올려둔 HTML을 돌려준다. 파일이 바뀌었을 때만(mtime/size) 다시 읽는다."""
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(frontend_dir, name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+
+    with lock:
+        page = html_pages.get(name)
+        if page is not None and page.stat_key == stat_key:
+            return page.asset
+
+    with open(path, "r", encoding="utf-8") as f:
+        html = rewrite_asset_refs(f.read())
+
+    page = HtmlPage(path)
+    page.stat_key = stat_key
+    page.asset = Asset(name, html.encode("utf-8"), guess_type(name))
+
+    with lock:
+        html_pages[name] = page
+    return page.asset
+
+
+def get_asset(name):
+    return assets_by_hash.get(name)
+
+
+def get_asset_by_name(name):
+    return assets.get(name)
+
+
+def asset_response_parts(asset, accept_encoding, if_none_match, cache_control):
+    """(status_code, body, headers)를 돌려준다."""
+    encoding, body = asset.select(accept_encoding)
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if if_none_match and asset.matches(if_none_match, encoding):
+        return 304, b"", headers
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return 200, body, headers
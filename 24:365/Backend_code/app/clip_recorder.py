@@ -0,0 +1,141 @@
+import os
+import queue
+import re
+import threading
+
+import cv2
+import numpy as np
+
+CLIP_DIR = os.getenv("CLIP_DIR", "clips")
+# 브라우저 <video>가 재생할 수 있도록 H.264(avc1)로 쓴다. OpenCV 빌드에 H.264 인코더가 없으면 mp4v로 대신한다
+CLIP_FOURCC = os.getenv("CLIP_FOURCC", "avc1")
+CLIP_FALLBACK_FOURCC = "mp4v"
+CLIP_EXTENSION = ".mp4"
+CLIP_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+RANGE_CHUNK_SIZE = 64 * 1024
+
+
+def clip_path(clip_id):
+    if not CLIP_ID_PATTERN.match(clip_id):
+        return None
+    return os.path.join(CLIP_DIR, clip_id + CLIP_EXTENSION)
+
+
+class ClipWriter:
+    """사건 클립을 백그라운드 스레드 하나에서 디스크에 쓴다. 캡처 스레드는 큐에 넣기만 한다."""
+
+    def __init__(self, max_pending=16):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, clip_id, frames, fps):
+        try:
+            self.queue.put_nowait((clip_id, frames, fps))
+            return True
+        except queue.Full:
+            print(f"⚠️ 클립 저장 대기열이 가득 차 클립 {clip_id}을(를) 버립니다.")
+            return False
+
+    def run(self):
+        while True:
+            clip_id, frames, fps = self.queue.get()
+            try:
+                self.write_clip(clip_id, frames, fps)
+            except Exception as e:
+                print(f"❌ 클립 {clip_id} 저장 오류: {e}")
+
+    def write_clip(self, clip_id, frames, fps):
+        path = clip_path(clip_id)
+        if path is None or not frames:
+            return
+
+        os.makedirs(CLIP_DIR, exist_ok=True)
+        # VideoWriter는 확장자로 컨테이너를 고르므로 임시 파일도 같은 확장자로 끝나야 한다
+        tmp_path = os.path.join(CLIP_DIR, clip_id + ".part" + CLIP_EXTENSION)
+
+        writer = None
+        for _, jpeg in frames:
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = open_video_writer(tmp_path, fps, (width, height))
+                if writer is None:
+                    print(f"❌ 클립 {clip_id}: 동영상 인코더를 열 수 없습니다.")
+                    return
+            writer.write(frame)
+
+        if writer is None:
+            return
+        writer.release()
+
+        # 다 쓴 뒤에만 이름을 바꿔서, 반쯤 쓰인 파일이 서빙되지 않게 한다
+        os.replace(tmp_path, path)
+        print(f"🎞️ 사건 클립 저장 완료: {path} ({len(frames)} frames)")
+
+
+def open_video_writer(path, fps, size):
+    for fourcc in dict.fromkeys((CLIP_FOURCC, CLIP_FALLBACK_FOURCC)):
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if writer.isOpened():
+            if fourcc != CLIP_FOURCC:
+                print(f"⚠️ {CLIP_FOURCC} 인코더를 열 수 없어 {fourcc}로 클립을 저장합니다 (브라우저에서 재생되지 않을 수 있습니다).")
+            return writer
+        writer.release()
+    return None
+
+
+class RangeNotSatisfiable(ValueError):
+    pass
+
+
+def parse_range_header(range_header, file_size):
+    """'bytes=start-end' 헤더를 (start, end)로 바꾼다.
+
+    형식이 틀린 헤더(다른 단위, 여러 구간, end < start 등)는 None을 돌려준다. RFC 9110에 따라 이때는
+    Range를 무시하고 전체를 200으로 보내면 된다. 형식은 맞지만 파일 안에 들어오지 않는 범위면
+    RangeNotSatisfiable을 올린다 (416).
+    """
+    match = re.match(r"bytes=(\d*)-(\d*)$", range_header.strip())
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+
+    if match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else file_size - 1
+        if match.group(2) and end < start:
+            return None
+    else:
+        suffix_length = int(match.group(2))
+        if suffix_length == 0:
+            raise RangeNotSatisfiable(range_header)
+        start = max(0, file_size - suffix_length)
+        end = file_size - 1
+
+    if start >= file_size:
+        raise RangeNotSatisfiable(range_header)
+    return start, min(end, file_size - 1)
+
+
+def iter_file_range(path, start, end, chunk_size=RANGE_CHUNK_SIZE):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+clip_writer = None
+
+
+def get_clip_writer():
+    global clip_writer
+    if clip_writer is None:
+        clip_writer = ClipWriter()
+    return clip_writer
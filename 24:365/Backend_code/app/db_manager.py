@@ -2,6 +2,7 @@ import sqlite3
 from typing import List, Dict, Any
 
 DATABASE_NAME = "detections.db"
+db_initialized = False
 
 def get_db_connection():
     conn = sqlite3.connect(DATABASE_NAME)
@@ -23,6 +24,11 @@ def init_db():
     conn.close()
 
 def save_detection_data(timestamp: str, detections: List[Dict[str, Any]]):
+    global db_initialized
+    if not db_initialized:
+        init_db()
+        db_initialized = True
+
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -38,6 +44,4 @@ def save_detection_data(timestamp: str, detections: List[Dict[str, Any]]):
             
     conn.commit()
     conn.close()
-    print(f"🟢🟢 DB SUCCESS: {len(detections)}개의 감지 데이터 저장 완료.") 
-
-init_db()
\ No newline at end of file
+    print(f"🟢🟢 DB SUCCESS: {len(detections)}개의 감지 데이터 저장 완료.")
@@ -8,6 +8,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 sys.path.insert(0, os.path.dirname(__file__))
 
 
+from app.frame_bus import CAMERA_SOURCE
+
+CAMERA_ID = os.getenv("CAMERA_ID", "0")
+
 VideoStreamer = None
 try:
     from video_streamer import VideoStreamer
@@ -21,9 +25,19 @@ except Exception as e:
 
 vs = None
 
-if VideoStreamer:
 
-    CAMERA_INDEX_TO_TRY = 0 
+def init_video_streamer():
+    """카메라 연결은 import 시점이 아니라 서버 lifespan에서 필요할 때 한 번만 한다."""
+    global vs
+
+    if vs is not None:
+        return True
+
+    if not VideoStreamer:
+        print("❌ VideoStreamer 클래스 로드 실패로 인해, vs 인스턴스는 None으로 설정됩니다.")
+        return False
+
+    CAMERA_INDEX_TO_TRY = CAMERA_SOURCE 
 
     print(f"🔄 VideoStreamer가 카메라 인덱스 {CAMERA_INDEX_TO_TRY}로 연결을 시도합니다...")
     
@@ -49,22 +63,34 @@ if VideoStreamer:
         print("❌❌ (자세한 오류 메시지):")
         traceback.print_exc(file=sys.stderr)
         vs = None 
-else:
-    print("❌ VideoStreamer 클래스 로드 실패로 인해, vs 인스턴스는 None으로 설정됩니다.")
 
+    return vs is not None
+
+
+def stop_video_streamer():
+    global vs
+    if vs is not None:
+        vs.stop()
+        vs = None
+
+
+def get_streamer(camera_id=None):
+    if camera_id is None or str(camera_id) == CAMERA_ID:
+        return vs
+    return None
 
 
 async def broadcast_event(message: str, connections: set):
 
     disconnected_websockets = set()
     
-    for websocket in connections:
+    # send_text를 기다리는 동안 연결이 추가/삭제될 수 있으므로 복사본을 돈다
+    for websocket in list(connections):
         try:
             await websocket.send_text(message)
         except Exception:
             disconnected_websockets.add(websocket)
 
     for websocket in disconnected_websockets:
-        if websocket in connections:
-            connections.remove(websocket)
+        connections.discard(websocket)
             
\ No newline at end of file
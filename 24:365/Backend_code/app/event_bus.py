@@ -0,0 +1,464 @@
+import fcntl
+import os
+import queue
+import select
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+# 워커/서버 사이에서 감지 이벤트와 공유 상태(저장 주기, 중복 제거, seq)를 주고받는 pub/sub 계층.
+#
+# EVENT_BUS_URL
+#   unix:///tmp/24365_event_bus.sock  (기본값) 같은 호스트의 워커끼리. 먼저 뜬 워커가 브로커를 맡는다.
+#   redis://[:password@]host:port/db   여러 호스트. Redis 또는 RESP 호환 서버.
+#   memory                             한 프로세스 안에서만 (워커 1개일 때)
+#
+# 로컬 브로커도 Redis와 같은 RESP 프로토콜을 쓰기 때문에 클라이언트 코드는 하나다.
+#
+# 구독 콜백은 callback(message, data)로 불린다. 같은 프로세스 안에서 전달되면 data는 게시할 때 넘긴
+# 원본 객체(검증된 dict나 모델)이고, 버스를 거쳐 받은 메시지면 None이라 그때만 message를 파싱하면 된다.
+# 로컬 브로커가 지원하는 명령: PING, PUBLISH, SUBSCRIBE, SET (NX/PX/EX), GET, DEL, INCR
+
+EVENT_BUS_URL = os.getenv("EVENT_BUS_URL", "unix:///tmp/24365_event_bus.sock")
+RECONNECT_DELAY = 1.0
+SOCKET_TIMEOUT = 2.0
+
+
+class RespError(Exception):
+    pass
+
+
+def encode_command(*args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def encode_simple(text):
+    return b"+%s\r\n" % text.encode("utf-8")
+
+
+def encode_error(text):
+    return b"-%s\r\n" % text.encode("utf-8")
+
+
+def encode_int(value):
+    return b":%d\r\n" % value
+
+
+def encode_bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def encode_array(items):
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+def read_reply(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("event bus connection closed")
+
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode("utf-8")
+    if prefix == b"-":
+        raise RespError(rest.decode("utf-8"))
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length == -1:
+            return None
+        return f.read(length + 2)[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length == -1:
+            return None
+        return [read_reply(f) for _ in range(length)]
+    raise RespError(f"unknown reply prefix: {line!r}")
+
+
+class RespConnection:
+    def __init__(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(SOCKET_TIMEOUT)
+            self.sock.connect(parsed.path)
+        else:
+            self.sock = socket.create_connection((parsed.hostname or "localhost", parsed.port or 6379),
+                                                 timeout=SOCKET_TIMEOUT)
+        self.file = self.sock.makefile("rb")
+
+        if parsed.scheme == "redis":
+            if parsed.password:
+                self.command("AUTH", parsed.password)
+            if parsed.path and parsed.path.strip("/"):
+                self.command("SELECT", parsed.path.strip("/"))
+
+    def command(self, *args):
+        self.send(*args)
+        return read_reply(self.file)
+
+    def send(self, *args):
+        self.sock.sendall(encode_command(*args))
+
+    def peer_closed(self):
+        """상대가 이미 연결을 닫았으면 True. 보내기 전에 확인해서, 죽은 연결에 명령을 쓰지 않는다."""
+        try:
+            readable, _, _ = select.select([self.sock], [], [], 0)
+            return bool(readable) and self.sock.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+    def close(self):
+        try:
+            self.file.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class LocalBrokerHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        self.write_lock = threading.Lock()
+
+    def send(self, data):
+        with self.write_lock:
+            self.wfile.write(data)
+            self.wfile.flush()
+
+    def handle(self):
+        broker = self.server.broker
+        try:
+            while True:
+                try:
+                    args = read_reply(self.rfile)
+                except ConnectionError:
+                    break
+                if not isinstance(args, list) or not args:
+                    self.send(encode_error("ERR protocol error"))
+                    continue
+                self.send(broker.execute(self, args))
+        except (OSError, RespError):
+            pass
+        finally:
+            broker.unsubscribe_all(self)
+
+
+class LocalBroker:
+    def __init__(self, seeds=None):
+        self.lock = threading.Lock()
+        self.channels = {}
+        # 브로커를 맡은 워커가 바뀌어도 INCR 카운터(seq)가 처음부터 다시 세지 않도록 시작값을 받는다
+        self.store = {str(key).encode(): (str(value).encode(), None) for key, value in (seeds or {}).items()}
+
+    def get_value(self, key):
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def execute(self, conn, args):
+        name = args[0].upper()
+        with self.lock:
+            if name == b"PING":
+                return encode_simple("PONG")
+
+            if name == b"PUBLISH":
+                channel, message = args[1], args[2]
+                subscribers = list(self.channels.get(channel, ()))
+                payload = encode_array([encode_bulk(b"message"), encode_bulk(channel), encode_bulk(message)])
+            elif name == b"SUBSCRIBE":
+                replies = []
+                for channel in args[1:]:
+                    self.channels.setdefault(channel, set()).add(conn)
+                    count = sum(1 for subs in self.channels.values() if conn in subs)
+                    replies.append(encode_array([encode_bulk(b"subscribe"), encode_bulk(channel), encode_int(count)]))
+                return b"".join(replies)
+            elif name == b"SET":
+                key, value = args[1], args[2]
+                options = [opt.upper() for opt in args[3:]]
+                ttl = None
+                if b"PX" in options:
+                    ttl = int(options[options.index(b"PX") + 1]) / 1000.0
+                elif b"EX" in options:
+                    ttl = int(options[options.index(b"EX") + 1])
+                if b"NX" in options and self.get_value(key) is not None:
+                    return encode_bulk(None)
+                self.store[key] = (value, time.monotonic() + ttl if ttl else None)
+                return encode_simple("OK")
+            elif name == b"GET":
+                return encode_bulk(self.get_value(args[1]))
+            elif name == b"DEL":
+                removed = sum(1 for key in args[1:] if self.store.pop(key, None) is not None)
+                return encode_int(removed)
+            elif name == b"INCR":
+                value = int(self.get_value(args[1]) or b"0") + 1
+                self.store[args[1]] = (str(value).encode(), None)
+                return encode_int(value)
+            else:
+                return encode_error(f"ERR unknown command '{name.decode()}'")
+
+        # PUBLISH: 구독자에게 보내는 건 lock 밖에서 (느린 구독자가 브로커 전체를 막지 않게)
+        delivered = 0
+        for subscriber in subscribers:
+            try:
+                subscriber.send(payload)
+                delivered += 1
+            except OSError:
+                self.unsubscribe_all(subscriber)
+        return encode_int(delivered)
+
+    def unsubscribe_all(self, conn):
+        with self.lock:
+            for subscribers in self.channels.values():
+                subscribers.discard(conn)
+
+
+class LocalBrokerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def try_start_local_broker(path, seeds=None):
+    """이 프로세스가 브로커를 맡을 수 있으면 띄운다. lock 파일로 한 프로세스만 브로커가 된다.
+
+    seeds: {key: 정수} INCR 카운터 시작값
+    """
+    lock_file = open(path + ".lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    server = LocalBrokerServer(path, LocalBrokerHandler)
+    server.broker = LocalBroker(seeds)
+    server.lock_file = lock_file
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"✅ 이벤트 버스 로컬 브로커 시작: {path} (pid {os.getpid()})")
+    return server
+
+
+class InProcessBus:
+    """워커가 하나일 때 쓰는 같은 인터페이스의 프로세스 내부 구현.
+
+    seeds: {key: 정수} INCR 카운터 시작값
+    """
+
+    def __init__(self, seeds=None):
+        self.lock = threading.Lock()
+        self.subscribers = {}
+        self.store = {}
+        self.seed(seeds)
+
+    def seed(self, seeds):
+        # 카운터를 시작값 이상으로만 올린다. 이미 더 세었으면 그대로 두어서 뒤로 가지 않는다
+        with self.lock:
+            for key, value in (seeds or {}).items():
+                self.store[key] = max(self.store.get(key, 0), int(value))
+
+    def publish(self, channel, message, data=None):
+        for callback in list(self.subscribers.get(channel, ())):
+            callback(message, data)
+
+    def subscribe(self, channel, callback):
+        self.subscribers.setdefault(channel, []).append(callback)
+
+    def acquire(self, key, ttl_seconds):
+        now = time.monotonic()
+        with self.lock:
+            expires_at = self.store.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self.store[key] = now + ttl_seconds
+            return True
+
+    def incr(self, key):
+        with self.lock:
+            value = self.store.get(key, 0) + 1
+            self.store[key] = value
+            return value
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class RespEventBus:
+    """RESP 서버(로컬 브로커 또는 Redis)를 쓰는 이벤트 버스.
+
+    버스에 닿지 않으면 이 프로세스 안에서라도 계속 동작하도록 InProcessBus로 대신한다.
+    구독 연결은 명령 연결과 따로 두고, 받은 메시지는 큐에 넣기만 한다. 콜백은 별도 스레드에서 실행되므로
+    콜백이 버스 명령을 보내도(command_lock) 구독 소켓 읽기가 멈추지 않는다.
+    """
+
+    def __init__(self, url, counter_seeds=None):
+        self.url = url
+        self.counter_seeds = counter_seeds
+        self.is_local = url.startswith("unix://")
+        self.broker_server = None
+        self.command_lock = threading.Lock()
+        self.conn = None
+        self.subscribers = {}
+        self.fallback = InProcessBus()
+        self.issued = {}  # key -> 버스에서 마지막으로 받은 INCR 값
+        self.inbox = queue.Queue()
+        self.stopped = False
+
+        self.conn = self.connect()
+
+    def start(self):
+        """subscribe()를 모두 마친 뒤 호출한다. 구독 연결은 별도 스레드가 유지한다."""
+        threading.Thread(target=self.subscribe_loop, daemon=True).start()
+        threading.Thread(target=self.dispatch_loop, daemon=True).start()
+
+    def connect(self):
+        if self.is_local:
+            path = urlparse(self.url).path
+            try:
+                return RespConnection(self.url)
+            except (FileNotFoundError, ConnectionRefusedError):
+                seeds = self.counter_seeds() if self.counter_seeds else None
+                self.broker_server = self.broker_server or try_start_local_broker(path, seeds)
+                deadline = time.time() + SOCKET_TIMEOUT
+                while True:
+                    try:
+                        return RespConnection(self.url)
+                    except (FileNotFoundError, ConnectionRefusedError):
+                        if time.time() > deadline:
+                            raise
+                        time.sleep(0.05)
+        return RespConnection(self.url)
+
+    def command(self, *args):
+        # 보내기까지 실패한 경우만 다시 연결해서 한 번 더 보낸다. 보낸 뒤 응답을 기다리다 실패하면
+        # 서버가 이미 실행했을 수 있으므로 PUBLISH/INCR가 두 번 실행되지 않게 다시 보내지 않는다
+        with self.command_lock:
+            for attempt in range(2):
+                try:
+                    if self.conn is not None and self.conn.peer_closed():
+                        self.drop_connection()
+                    if self.conn is None:
+                        self.conn = self.connect()
+                    self.conn.send(*args)
+                    break
+                except (OSError, ConnectionError):
+                    self.drop_connection()
+                    if attempt == 1:
+                        raise
+            try:
+                return read_reply(self.conn.file)
+            except (OSError, ConnectionError):
+                self.drop_connection()
+                raise
+
+    def drop_connection(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+
+    def publish(self, channel, message, data=None):
+        try:
+            self.command("PUBLISH", channel, message)
+        except (OSError, ConnectionError) as e:
+            print(f"⚠️ 이벤트 버스 게시 실패, 이 워커에만 전달합니다: {e}")
+            self.fallback.publish(channel, message, data)
+
+    def subscribe(self, channel, callback):
+        self.subscribers.setdefault(channel, []).append(callback)
+        # 버스가 끊겼을 때 이 워커 안에서 게시된 이벤트는 fallback으로 받는다
+        self.fallback.subscribe(channel, callback)
+
+    def acquire(self, key, ttl_seconds):
+        try:
+            return self.command("SET", key, "1", "NX", "PX", int(ttl_seconds * 1000)) == "OK"
+        except (OSError, ConnectionError):
+            return self.fallback.acquire(key, ttl_seconds)
+
+    def incr(self, key):
+        try:
+            value = self.command("INCR", key)
+        except (OSError, ConnectionError):
+            # 버스에서 받은 마지막 값과 시작값(링에서 본 seq) 뒤에서 이어서 세어, 클라이언트가 보는 seq가 뒤로 가지 않게 한다
+            seeds = self.counter_seeds() if self.counter_seeds else {}
+            self.fallback.seed({key: max(self.issued.get(key, 0), int(seeds.get(key, 0)))})
+            return self.fallback.incr(key)
+        self.issued[key] = value
+        return value
+
+    def subscribe_loop(self):
+        while not self.stopped:
+            conn = None
+            try:
+                conn = self.connect()
+                conn.sock.settimeout(None)
+                channels = list(self.subscribers)
+                if not channels:
+                    conn.close()
+                    time.sleep(0.1)
+                    continue
+
+                conn.sock.sendall(encode_command("SUBSCRIBE", *channels))
+                while not self.stopped:
+                    reply = read_reply(conn.file)
+                    if isinstance(reply, list) and reply and reply[0] == b"message":
+                        self.inbox.put((reply[1].decode("utf-8"), reply[2].decode("utf-8")))
+            except (OSError, ConnectionError, RespError) as e:
+                if not self.stopped:
+                    print(f"⚠️ 이벤트 버스 구독 연결 끊김, 재연결합니다: {e}")
+                    time.sleep(RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def dispatch_loop(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                break
+            channel, message = item
+            for callback in list(self.subscribers.get(channel, ())):
+                try:
+                    callback(message, None)
+                except Exception as e:
+                    print(f"ERROR: 이벤트 버스 구독 처리 오류: {e}")
+
+    def close(self):
+        self.stopped = True
+        self.inbox.put(None)
+        if self.conn is not None:
+            self.conn.close()
+        if self.broker_server is not None:
+            self.broker_server.shutdown()
+            self.broker_server.server_close()
+            self.broker_server.lock_file.close()
+            self.broker_server = None
+
+
+def create_event_bus(url=EVENT_BUS_URL, counter_seeds=None):
+    if url == "memory":
+        return InProcessBus()
+    try:
+        return RespEventBus(url, counter_seeds)
+    except (OSError, ConnectionError) as e:
+        print(f"⚠️ 이벤트 버스({url}) 연결 실패, 프로세스 내부 버스로 동작합니다: {e}")
+        return InProcessBus(counter_seeds() if counter_seeds else None)
@@ -0,0 +1,74 @@
+import os
+import threading
+from collections import deque
+
+# 최근 감지 이벤트를 프로세스 메모리에 고정 크기로 보관한다.
+#  - 카메라별 링: 새 WebSocket 연결의 backfill, 재연결 시 since 이후 replay에 사용
+#  - 경보 행 링: DB에 저장된 화재/연기 행을 그대로 보관해서 최근 구간 /get_logs/ 를 DB 없이 응답
+
+EVENTS_PER_CAMERA = int(os.getenv("EVENTS_PER_CAMERA", "200"))
+ALERT_ROWS = int(os.getenv("ALERT_ROWS", "500"))
+DEFAULT_CAMERA_ID = "default"
+# seq가 이만큼 넘게 뒤로 가면 워커끼리의 순서 차이가 아니라 카운터가 다시 시작된 것으로 본다
+SEQ_RESET_GAP = 10000
+
+
+class RecentEvents:
+    def __init__(self, events_per_camera=EVENTS_PER_CAMERA, alert_rows=ALERT_ROWS):
+        self.events_per_camera = events_per_camera
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.rings = {}
+        self.alert_rows = deque(maxlen=alert_rows)
+
+    def append(self, seq, camera_id, message):
+        """이벤트 버스에서 받은 seq와 이미 직렬화된 메시지를 보관한다."""
+        camera_id = str(camera_id) if camera_id is not None else DEFAULT_CAMERA_ID
+        with self.lock:
+            if seq < self.seq - SEQ_RESET_GAP:
+                # 이전 카운터의 seq와 섞이면 since()가 새 이벤트를 못 돌려주므로 링을 비우고 새로 센다
+                self.rings.clear()
+                self.seq = seq
+            self.seq = max(self.seq, seq)
+            ring = self.rings.get(camera_id)
+            if ring is None:
+                ring = self.rings[camera_id] = deque(maxlen=self.events_per_camera)
+            ring.append((seq, message))
+
+    def since(self, seq):
+        """seq 이후의 메시지를 seq 순서대로 돌려준다."""
+        with self.lock:
+            events = [event for ring in self.rings.values() for event in ring if event[0] > seq]
+        events.sort(key=lambda event: event[0])
+        return [message for _, message in events]
+
+    def latest(self, count):
+        with self.lock:
+            events = [event for ring in self.rings.values() for event in ring]
+        events.sort(key=lambda event: event[0])
+        return [message for _, message in events[-count:]] if count > 0 else []
+
+    def add_alert_row(self, row: dict):
+        with self.lock:
+            self.alert_rows.append(row)
+
+    def update_alert_row(self, row_id, fields: dict):
+        """링에 있는 경보 행(id 기준)에 나중에 정해진 값(snapshot_hash 등)을 반영한다."""
+        with self.lock:
+            for row in reversed(self.alert_rows):
+                if row.get("id") == row_id:
+                    row.update(fields)
+                    return True
+        return False
+
+    def recent_alert_rows(self, limit):
+        """최신순 경보 행 limit개. 링에 limit개가 안 모였으면 None (DB에서 읽어야 함)."""
+        with self.lock:
+            if len(self.alert_rows) < limit:
+                return None
+            rows = list(self.alert_rows)[-limit:]
+        rows.sort(key=lambda row: row["timestamp"], reverse=True)
+        return rows
+
+
+recent_events = RecentEvents()
@@ -0,0 +1,268 @@
+import argparse
+import os
+import struct
+import time
+from multiprocessing import get_context, resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+# 카메라 하나당 캡처 프로세스 하나가 디코딩한 프레임을 공유 메모리 링 버퍼에 올리고,
+# 감지기/웹 서버는 그 버퍼에서 프레임을 한 번 복사해 읽는다 (디코딩은 카메라당 한 번).
+#
+# 메모리 배치: [버스 헤더][슬롯 헤더 + 프레임] * slots
+#   버스 헤더: latest_seq, height, width, channels, slots, writer_pid, generation
+#   슬롯 헤더: seq, timestamp
+#
+# 캡처 프로세스가 다시 뜨면 같은 이름으로 새 버퍼(새 generation)를 만들고, 읽는 쪽은 새 프레임이 끊기면 다시 붙는다.
+
+SHM_PREFIX = "frame_bus_"
+SOURCE_PREFIX = "shm://"
+DEFAULT_SLOTS = 8
+READ_RETRIES = 3
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")
+
+BUS_HEADER = struct.Struct("<QIIIIIQ")
+SLOT_HEADER = struct.Struct("<Qd")
+
+
+def shm_name(camera_id):
+    return f"{SHM_PREFIX}{camera_id}"
+
+
+def pid_alive(pid):
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def parse_source(src):
+    if isinstance(src, str) and src.isdigit():
+        return int(src)
+    return src
+
+
+class FrameBusWriter:
+    def __init__(self, camera_id, shape, slots=DEFAULT_SLOTS):
+        self.camera_id = str(camera_id)
+        self.height, self.width = shape[:2]
+        self.channels = shape[2] if len(shape) > 2 else 1
+        self.slots = slots
+        self.frame_size = self.height * self.width * self.channels
+        self.slot_size = SLOT_HEADER.size + self.frame_size
+        self.seq = 0
+
+        name = shm_name(self.camera_id)
+        size = BUS_HEADER.size + self.slot_size * slots
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 이전 캡처 프로세스가 비정상 종료하며 남긴 버퍼만 지우고 새로 만든다.
+            # 아직 살아 있는 캡처 프로세스가 쓰고 있는 버퍼면 건드리지 않는다.
+            existing = shared_memory.SharedMemory(name=name)
+            writer_pid = BUS_HEADER.unpack_from(existing.buf, 0)[5] if existing.size >= BUS_HEADER.size else 0
+            if writer_pid != os.getpid() and pid_alive(writer_pid):
+                existing.close()
+                resource_tracker.unregister(existing._name, "shared_memory")
+                raise RuntimeError(f"프레임 버스 '{name}'는 이미 캡처 프로세스(pid {writer_pid})가 쓰고 있습니다.")
+            existing.close()
+            existing.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        BUS_HEADER.pack_into(self.shm.buf, 0, 0, self.height, self.width, self.channels, slots,
+                             os.getpid(), time.time_ns())
+
+    def publish(self, frame):
+        if frame.shape[:2] != (self.height, self.width):
+            frame = cv2.resize(frame, (self.width, self.height))
+
+        seq = self.seq + 1
+        offset = BUS_HEADER.size + (seq % self.slots) * self.slot_size
+
+        # 쓰는 중에는 슬롯 seq를 0으로 두어 읽는 쪽이 반쯤 쓰인 프레임을 쓰지 않게 한다
+        SLOT_HEADER.pack_into(self.shm.buf, offset, 0, 0.0)
+        view = np.ndarray((self.height, self.width, self.channels), dtype=np.uint8,
+                          buffer=self.shm.buf, offset=offset + SLOT_HEADER.size)
+        view[...] = frame.reshape(view.shape)
+        SLOT_HEADER.pack_into(self.shm.buf, offset, seq, time.time())
+
+        struct.pack_into("<Q", self.shm.buf, 0, seq)
+        self.seq = seq
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameBusReader:
+    def __init__(self, camera_id):
+        self.camera_id = str(camera_id)
+        self.shm = shared_memory.SharedMemory(name=shm_name(self.camera_id))
+        # 읽는 쪽이 종료될 때 resource_tracker가 버퍼를 unlink 하지 않도록 등록 해제
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+
+        (_, self.height, self.width, self.channels, self.slots,
+         self.writer_pid, self.generation) = BUS_HEADER.unpack_from(self.shm.buf, 0)
+        self.frame_size = self.height * self.width * self.channels
+        self.slot_size = SLOT_HEADER.size + self.frame_size
+
+    def latest_seq(self):
+        return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+    def read(self, seq=None):
+        """seq(기본값: 최신) 프레임의 (seq, timestamp, frame)을 반환한다.
+
+        frame은 슬롯을 복사한 배열이다. 복사하는 동안 쓰는 쪽이 그 슬롯을 덮어쓰면 찢어진 프레임이므로 버리고,
+        최신 프레임을 읽는 경우에는 READ_RETRIES번까지 다시 읽는다. 지정한 seq가 이미 덮어써졌으면 (0, 0.0, None).
+        """
+        for _ in range(READ_RETRIES if seq is None else 1):
+            want = self.latest_seq() if seq is None else seq
+            if want == 0:
+                return 0, 0.0, None
+
+            offset = BUS_HEADER.size + (want % self.slots) * self.slot_size
+            slot_seq, timestamp = SLOT_HEADER.unpack_from(self.shm.buf, offset)
+            if slot_seq != want:
+                continue
+
+            frame = np.ndarray((self.height, self.width, self.channels), dtype=np.uint8,
+                               buffer=self.shm.buf, offset=offset + SLOT_HEADER.size).copy()
+            if self.is_current(want):
+                return want, timestamp, frame
+        return 0, 0.0, None
+
+    def is_current(self, seq):
+        offset = BUS_HEADER.size + (seq % self.slots) * self.slot_size
+        return SLOT_HEADER.unpack_from(self.shm.buf, offset)[0] == seq
+
+    def close(self):
+        self.shm.close()
+
+
+class SharedFrameCapture:
+    """cv2.VideoCapture 대신 쓸 수 있는 프레임 버스 리더 (isOpened / read / release).
+
+    timeout초 동안 새 프레임이 없으면 캡처 프로세스가 다시 떴을 수 있으므로 버퍼에 다시 붙어 본다.
+    """
+
+    def __init__(self, camera_id, poll_interval=0.005, timeout=2.0, open_timeout=0.0):
+        self.camera_id = str(camera_id)
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.last_seq = 0
+        self.skipped = 0  # 읽기 전에 덮어써져서 놓친 프레임 수
+        self.reader = None
+
+        # 캡처 프로세스를 방금 띄웠으면 버퍼가 만들어질 때까지 open_timeout초 기다린다
+        deadline = time.time() + open_timeout
+        while not self.attach() and time.time() < deadline:
+            time.sleep(0.1)
+        if self.reader is None:
+            print(f"🚨🚨 프레임 버스 '{shm_name(camera_id)}'가 없습니다. 캡처 프로세스를 먼저 실행하세요.")
+
+    def attach(self):
+        """버퍼를 (다시) 연다. 캡처 프로세스가 새 버퍼를 만들었으면 그쪽으로 바꾼다."""
+        try:
+            reader = FrameBusReader(self.camera_id)
+        except FileNotFoundError:
+            return self.reader is not None
+
+        if self.reader is not None and reader.generation == self.reader.generation:
+            reader.close()
+            return True
+        if self.reader is not None:
+            self.reader.close()
+            print(f"🔄 프레임 버스 '{shm_name(self.camera_id)}'가 새로 만들어져 다시 연결했습니다.")
+        self.reader = reader
+        self.last_seq = 0
+        return True
+
+    def isOpened(self):
+        return self.reader is not None
+
+    def read(self):
+        if self.reader is None and not self.attach():
+            time.sleep(self.timeout)
+            return False, None
+
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            seq = self.reader.latest_seq()
+            if seq != self.last_seq:
+                seq, _, frame = self.reader.read(seq)
+                if frame is not None:
+                    if self.last_seq:
+                        self.skipped += max(0, seq - self.last_seq - 1)
+                    self.last_seq = seq
+                    return True, frame
+            time.sleep(self.poll_interval)
+
+        self.attach()
+        return False, None
+
+    def release(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def open_capture(src, open_timeout=0.0):
+    """'shm://<camera_id>' 이면 프레임 버스를, 아니면 cv2.VideoCapture를 연다."""
+    if isinstance(src, str) and src.startswith(SOURCE_PREFIX):
+        return SharedFrameCapture(src[len(SOURCE_PREFIX):], open_timeout=open_timeout)
+    return cv2.VideoCapture(parse_source(src))
+
+
+def run_capture(camera_id, src, slots=DEFAULT_SLOTS):
+    stream = cv2.VideoCapture(parse_source(src))
+    if not stream.isOpened():
+        print(f"🚨🚨 Camera {src} failed to open.")
+        return
+
+    grabbed, frame = stream.read()
+    if not grabbed:
+        print(f"🚨🚨 Camera {src} 첫 프레임을 읽지 못했습니다.")
+        stream.release()
+        return
+
+    try:
+        writer = FrameBusWriter(camera_id, frame.shape, slots)
+    except RuntimeError as e:
+        print(f"🚨🚨 {e}")
+        stream.release()
+        return
+    print(f"✅ 카메라 {src} → 프레임 버스 '{shm_name(camera_id)}' 게시 시작 ({writer.width}x{writer.height}, {slots} slots)")
+
+    try:
+        while grabbed:
+            writer.publish(frame)
+            grabbed, frame = stream.read()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.release()
+        writer.close()
+        print(f"✅ Camera {src} stream released.")
+
+
+def start_capture_process(camera_id, src, slots=DEFAULT_SLOTS):
+    # 부모가 이미 모델/GPU를 올린 뒤에 다시 띄울 수 있으므로 fork 대신 spawn으로 깨끗한 프로세스를 만든다
+    process = get_context("spawn").Process(target=run_capture, args=(camera_id, src, slots), daemon=True)
+    process.start()
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="카메라 한 대를 디코딩해 공유 메모리 프레임 버스에 게시합니다.")
+    parser.add_argument("--camera-id", default="0")
+    parser.add_argument("--source", default=CAMERA_SOURCE)
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS)
+    args = parser.parse_args()
+
+    run_capture(args.camera_id, args.source, args.slots)
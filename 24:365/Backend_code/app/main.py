@@ -1,21 +1,47 @@
 import asyncio
 import logging
+import os
+import sys
 from typing import List, Dict
 import cv2
 import numpy as np
 import time
+import hashlib
 import json
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime, date
 from threading import Thread
 
 import mysql.connector 
+from pydantic import ValidationError
 
-from fastapi import FastAPI, WebSocket, Request, Response, WebSocketDisconnect
-from fastapi.responses import HTMLResponse, StreamingResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from fastapi import FastAPI, WebSocket, Request, Response, WebSocketDisconnect, Query
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from uvicorn import run as uvicorn_run
 
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.frame_bus import CAMERA_SOURCE, open_capture
+from app import dependencies
+from app.clip_recorder import RangeNotSatisfiable, clip_path, iter_file_range, parse_range_header
+from app.snapshot_store import read_snapshot, snapshot_exists, submit_snapshot
+from app import asset_pipeline
+from app import archiver
+from app.event_ring import recent_events
+from app.event_bus import EVENT_BUS_URL, InProcessBus, create_event_bus
+from app import video_codec
+from app.admission import admission
+from app.schemas import BOX_FIELDS, DetectionEvent
+from app.alert_rules import AlertEngine
+from app.overlay import overlay_ttl
+
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "user": os.getenv("DB_USER"),
@@ -27,7 +53,8 @@ TABLE_NAME = "detection"
 MAX_LOG_ENTRIES = 100000
 
 DB_SAVE_INTERVAL = 10
-last_db_save_time: Dict[str, float] = {}
+SIMULATE_DETECTIONS = os.getenv("SIMULATE_DETECTIONS", "0") == "1"
+DEDUP_WINDOW = 2
 
 try:
     __app_id = __app_id
@@ -39,9 +66,22 @@ except NameError:
 AI_SERVER_ID = "24365"
 
 websocket_clients = set()
+alert_clients = set()
 camera = None
 event_loop = None
 
+def json_dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def create_connection():
     try:
         cnx = mysql.connector.connect(**DB_CONFIG, use_pure=True)
@@ -57,15 +97,9 @@ def check_db_and_create_table():
         return False
     
     cursor = cnx.cursor()
-    
-    try:
-        cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
-        cnx.commit()
-    except mysql.connector.Error as err:
-        print(f"{err}")
         
     create_table_sql = f"""
-        CREATE TABLE {TABLE_NAME} (
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
             id INT AUTO_INCREMENT PRIMARY KEY,
             timestamp DATETIME NOT NULL,
             ai_server_id VARCHAR(50) NOT NULL,
@@ -76,13 +110,17 @@ def check_db_and_create_table():
             location_x DECIMAL(5, 4) NULL,
             location_y DECIMAL(5, 4) NULL,
             box_width DECIMAL(5, 4) NULL,
-            box_height DECIMAL(5, 4) NULL
+            box_height DECIMAL(5, 4) NULL,
+            clip_id VARCHAR(64) NULL,
+            snapshot_hash CHAR(64) NULL
         )
     """
     
     try:
         cursor.execute(create_table_sql)
         cnx.commit()
+        add_missing_columns(cursor)
+        cnx.commit()
         return True
     except mysql.connector.Error as err:
         print(f"ERROR: MySQL 테이블 생성 오류: {err}")
@@ -91,7 +129,28 @@ def check_db_and_create_table():
         cursor.close()
         cnx.close()
 
+ADDED_COLUMNS = {
+    "clip_id": "VARCHAR(64) NULL",
+    "snapshot_hash": "CHAR(64) NULL",
+}
+
+def add_missing_columns(cursor):
+    # 기존 테이블은 지우지 않고, 나중에 추가된 컬럼만 붙인다
+    cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (TABLE_NAME,),
+    )
+    existing = {row[0] for row in cursor.fetchall()}
+    for column, definition in ADDED_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN {column} {definition}")
+            print(f"INFO: {TABLE_NAME} 테이블에 {column} 컬럼 추가")
+
 def manage_log_limit(cnx):
+    if archiver.archiving_active():
+        # 보관 계층이 정상 동작 중이면 MAX_LOG_ENTRIES 초과분은 지우지 않고 archiver가 파일로 옮긴다
+        return
+
     cursor = cnx.cursor()
     try:
         cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}")
@@ -99,6 +158,9 @@ def manage_log_limit(cnx):
         
         if count > MAX_LOG_ENTRIES:
             delete_count = count - MAX_LOG_ENTRIES
+            if archiver.ARCHIVE_ENABLED:
+                print(f"WARNING: 감지 기록 보관이 동작하지 않아({archiver.last_archive_error or '시작 전'}) "
+                      f"오래된 기록 {delete_count}개를 보관 없이 삭제합니다.")
             
             delete_sql = f"""
                 DELETE FROM {TABLE_NAME} 
@@ -116,7 +178,7 @@ def manage_log_limit(cnx):
     finally:
         cursor.close()
 
-def log_to_mysql(data: dict):
+def log_to_mysql(event: DetectionEvent):
     cnx = create_connection()
     if not cnx:
         return
@@ -125,47 +187,34 @@ def log_to_mysql(data: dict):
     
     sql = f"""
         INSERT INTO {TABLE_NAME} 
-        (timestamp, ai_server_id, class_name, confidence, is_fire_detected, is_smoke_detected, location_x, location_y, box_width, box_height)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        (timestamp, ai_server_id, class_name, confidence, is_fire_detected, is_smoke_detected, location_x, location_y, box_width, box_height, clip_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
     """
     
-    detection_time = datetime.now()
-    if 'timestamp' in data:
-        try:
-            detection_time = datetime.fromisoformat(data['timestamp'])
-        except (ValueError, TypeError):
-            pass
-
-    class_name = data.get("class_name", "UNKNOWN").upper()
-    is_fire = data.get("is_fire_detected", False) or class_name == 'FIRE'
-    is_smoke = data.get("is_smoke_detected", False) or class_name == 'SMOKE'
-    confidence = data.get("confidence", 0.0)
-
-    def safe_float(key):
-        val = data.get(key)
-        try:
-            return float(val) if val is not None else None
-        except ValueError:
-            return None
-            
-    log_data = (
-        detection_time,
-        data.get("ai_server_id", AI_SERVER_ID),
-        class_name,
-        confidence,
-        is_fire,
-        is_smoke,
-        safe_float("location_x"),
-        safe_float("location_y"),
-        safe_float("box_width"),
-        safe_float("box_height")
-    )
+    # 필드 이름 통일과 형 변환은 DetectionEvent 검증에서 끝났으므로 값만 옮긴다
+    log_row = {
+        "timestamp": event.timestamp,
+        "ai_server_id": event.ai_server_id or AI_SERVER_ID,
+        "class_name": event.class_name,
+        "confidence": event.confidence,
+        "is_fire_detected": event.is_fire_detected,
+        "is_smoke_detected": event.is_smoke_detected,
+        "location_x": event.location_x,
+        "location_y": event.location_y,
+        "box_width": event.box_width,
+        "box_height": event.box_height,
+        "clip_id": event.clip_id,
+    }
+    log_data = tuple(log_row.values())
 
     try:
         cursor.execute(sql, log_data)
         cnx.commit()
+        log_row["id"] = cursor.lastrowid
+        log_row["snapshot_hash"] = None
         
         manage_log_limit(cnx) 
+        return log_row
 
     except mysql.connector.Error as err:
         print(f"ERROR: MySQL 데이터 삽입 오류: {err}")
@@ -178,10 +227,27 @@ def log_to_mysql(data: dict):
         cnx.close()
         
 
+def update_snapshot_hash(row_id: int, snapshot_hash: str):
+    cnx = create_connection()
+    if not cnx:
+        return
+
+    cursor = cnx.cursor()
+    try:
+        cursor.execute(f"UPDATE {TABLE_NAME} SET snapshot_hash = %s WHERE id = %s", (snapshot_hash, row_id))
+        cnx.commit()
+    except mysql.connector.Error as err:
+        print(f"ERROR: 스냅샷 해시 저장 오류: {err}")
+        cnx.rollback()
+    finally:
+        cursor.close()
+        cnx.close()
+
+
 def get_camera():
     global camera
     if camera is None:
-        camera = cv2.VideoCapture(0)
+        camera = open_capture(CAMERA_SOURCE)
         if not camera.isOpened():
             print("ERROR: 웹캠을 열 수 없습니다. 더미 프레임을 사용합니다.")
             camera = 'dummy'
@@ -217,19 +283,140 @@ async def broadcast_detection(message: str):
                 pass
 
 
+DETECTIONS_CHANNEL = "detections"
+ALERT_ROWS_CHANNEL = "alert_rows"
+ALERT_ROW_UPDATES_CHANNEL = "alert_row_updates"
+DETECTOR_STATS_CHANNEL = "detector_stats"
+ALERTS_CHANNEL = "alerts"
+RECENT_ALERTS = 100
+# 감지기 요약이 보고 주기(window_seconds)의 이 배수만큼 끊기면 종료된 감지기로 보고 지운다
+DETECTOR_STATS_STALE_INTERVALS = 3
+DETECTOR_STATS_DEFAULT_INTERVAL = 30
+
+
+# 감지기 프로세스(ai_server_id/host/pid)별 최신 프로파일 요약
+detector_stats = {}
+# 규칙은 lifespan의 "alert_rules" 단계에서 읽는다
+alert_engine = AlertEngine()
+recent_alerts = deque(maxlen=RECENT_ALERTS)
+
+
+def update_overlay(camera_id, detection_data: dict):
+    # 이 워커가 가진 카메라 스트림이면 영상 위 박스도 갱신한다 (감지기 전송 주기에서 정한 TTL 뒤 자동으로 사라짐)
+    streamer = dependencies.get_streamer(camera_id)
+    if streamer is None:
+        return
+    streamer.add_detections(detection_data.get("ai_server_id", AI_SERVER_ID), [detection_data],
+                            overlay_ttl(detection_data.get("submission_interval")))
+
+
+def evaluate_alerts(detection_data: dict):
+    # 모든 워커가 같은 순서로 같은 이벤트를 받으므로 규칙 상태는 워커마다 같다.
+    # 경보 게시는 버스의 SET NX PX 로 규칙 cooldown 동안 한 워커만 한 번 한다
+    for rule, alert in alert_engine.evaluate(detection_data):
+        if event_bus.acquire(f"alert:{rule.name}:{alert['key']}", rule.cooldown):
+            event_bus.publish(ALERTS_CHANNEL, json_dumps(alert), alert)
+
+
+def event_data(message: str, data):
+    # 같은 프로세스 안에서 전달되면 게시한 쪽의 검증된 dict가 같이 오므로 다시 파싱하지 않는다.
+    # 버스(소켓)를 거쳐 받은 메시지일 때만 파싱한다
+    return json_loads(message) if data is None else data
+
+
+def on_detection_event(envelope: str, data=None):
+    # 버스로 받은 이벤트는 이 워커의 링에 넣고, 이 워커에 붙은 WebSocket 클라이언트에게 보낸다
+    seq, camera_id, message = envelope.split("\t", 2)
+    recent_events.append(int(seq), camera_id or None, message)
+    if event_loop is not None and event_loop.is_running():
+        asyncio.run_coroutine_threadsafe(broadcast_detection(message), event_loop)
+
+    # 같은 프로세스에서 게시된 이벤트는 검증된 DetectionEvent가 같이 오므로 파싱 대신 dict로만 바꾼다
+    if data is None:
+        detection_data = json_loads(message)
+    else:
+        detection_data = data.model_dump(mode="json", exclude_none=True)
+    update_overlay(camera_id or None, detection_data)
+    evaluate_alerts(detection_data)
+
+
+def on_alert_event(message: str, data=None):
+    print(f"🚨 경보 규칙 발생: {message}")
+    recent_alerts.append(message)
+    if event_loop is not None and event_loop.is_running():
+        asyncio.run_coroutine_threadsafe(dependencies.broadcast_event(message, alert_clients), event_loop)
+
+
+def on_alert_row_event(message: str, data=None):
+    # 링의 행은 나중에 갱신되므로 게시한 쪽의 dict와 공유하지 않게 복사해서 넣는다
+    recent_events.add_alert_row(dict(event_data(message, data)))
+
+
+def on_alert_row_update_event(message: str, data=None):
+    # 스냅샷처럼 행을 게시한 뒤에 정해지는 값은 {id, ...} 갱신으로 따로 온다
+    update = dict(event_data(message, data))
+    recent_events.update_alert_row(update.pop("id"), update)
+
+
+def report_interval(report: dict):
+    try:
+        return float(report.get("window_seconds") or DETECTOR_STATS_DEFAULT_INTERVAL)
+    except (TypeError, ValueError):
+        return DETECTOR_STATS_DEFAULT_INTERVAL
+
+
+def prune_detector_stats(now: float):
+    stale = [
+        key for key, report in list(detector_stats.items())
+        if now - report["received_at"] > DETECTOR_STATS_STALE_INTERVALS * report_interval(report)
+    ]
+    for key in stale:
+        detector_stats.pop(key, None)
+
+
+def on_detector_stats_event(message: str, data=None):
+    report = dict(event_data(message, data))
+    now = time.time()
+    report["received_at"] = now
+    detector_stats[f"{report.get('ai_server_id')}/{report.get('host')}/{report.get('pid')}"] = report
+    # 감지기가 재시작할 때마다 pid가 바뀌므로, 끊긴 감지기의 요약은 여기서 정리한다
+    prune_detector_stats(now)
+
+
+def attach_subscribers(bus):
+    bus.subscribe(DETECTIONS_CHANNEL, on_detection_event)
+    bus.subscribe(ALERT_ROWS_CHANNEL, on_alert_row_event)
+    bus.subscribe(ALERT_ROW_UPDATES_CHANNEL, on_alert_row_update_event)
+    bus.subscribe(DETECTOR_STATS_CHANNEL, on_detector_stats_event)
+    bus.subscribe(ALERTS_CHANNEL, on_alert_event)
+    bus.start()
+    return bus
+
+
+# lifespan에서 EVENT_BUS_URL 버스로 교체된다. 그 전에는 이 프로세스 안에서만 전달한다.
+event_bus = attach_subscribers(InProcessBus())
+
+
+def detection_seq_seed():
+    # 이 워커가 브로커를 새로 맡으면, 링에서 본 가장 큰 seq부터 이어서 센다
+    return {"detections:seq": recent_events.seq}
+
+
+def init_event_bus():
+    global event_bus
+    event_bus = attach_subscribers(create_event_bus(counter_seeds=detection_seq_seed))
+    if EVENT_BUS_URL == "memory":
+        # 워커 1개로 일부러 프로세스 내부 버스를 쓰는 경우
+        return None
+    return not isinstance(event_bus, InProcessBus)
+
+
 def simulate_yolo_detection():
     CLASSES = [
         {"name": "FIRE", "color": (0, 0, 255)}, 
         {"name": "SMOKE", "color": (0, 165, 255)},
     ]
     
-    try:
-        current_loop = asyncio.get_event_loop()
-    except RuntimeError:
-        current_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(current_loop)
-
-
     while True:
         try:
             if np.random.rand() < 0.15: 
@@ -242,33 +429,17 @@ def simulate_yolo_detection():
                 location_x = round(np.random.uniform(0.1, 0.9), 2)
                 location_y = round(np.random.uniform(0.1, 0.9), 2)
                 
-                is_fire = (class_name == "FIRE")
-                is_smoke = (class_name == "SMOKE")
+                event = DetectionEvent(
+                    ai_server_id=AI_SERVER_ID,
+                    class_name=class_name,
+                    confidence=confidence,
+                    location_x=location_x,
+                    location_y=location_y,
+                    box_width=box_width,
+                    box_height=box_height,
+                )
                 
-                detection_data = {
-                    "timestamp": datetime.now().isoformat(),
-                    "ai_server_id": AI_SERVER_ID,
-                    "class_name": class_name, 
-                    "confidence": confidence,
-                    "is_fire_detected": is_fire,
-                    "is_smoke_detected": is_smoke,
-                    "location_x": location_x, 
-                    "location_y": location_y,
-                    "box_width": box_width,
-                    "box_height": box_height,
-                }
-                
-                message = json.dumps(detection_data)
-                
-                current_time = time.time()
-                ai_server_id_sim = detection_data.get("ai_server_id", AI_SERVER_ID)
-                last_save_time_sim = last_db_save_time.get(ai_server_id_sim, 0.0)
-
-                if current_time - last_save_time_sim >= DB_SAVE_INTERVAL:
-                    print(f"INFO: Sim log skipped (DB save disabled for testing).")
-
-                if current_loop.is_running():
-                    asyncio.run_coroutine_threadsafe(broadcast_detection(message), current_loop)
+                publish_detection(event)
                 
             time.sleep(0.2) 
             
@@ -281,12 +452,78 @@ def simulate_yolo_detection():
             print(f"Unexpected Simulation Error: {e}")
             time.sleep(1)
 
-detection_thread = Thread(target=simulate_yolo_detection)
-detection_thread.daemon = True
-detection_thread.start()
+def start_simulator():
+    if not SIMULATE_DETECTIONS:
+        return None
+    detection_thread = Thread(target=simulate_yolo_detection)
+    detection_thread.daemon = True
+    detection_thread.start()
+    return True
+
+
+# 서브시스템은 import 시점이 아니라 lifespan에서 병렬로 띄우고, 상태는 /ready 로 확인한다.
+# 각 함수는 성공하면 True, 꺼져 있으면 None, 실패하면 False(또는 예외)를 돌려준다.
+STARTUP_COMPONENTS = {
+    "database": check_db_and_create_table,
+    "assets": asset_pipeline.build_assets,
+    "video": dependencies.init_video_streamer,
+    "simulator": start_simulator,
+    "event_bus": init_event_bus,
+    "alert_rules": alert_engine.load,
+    "archiver": lambda: archiver.start_archiver(create_connection, TABLE_NAME, MAX_LOG_ENTRIES),
+}
+# 다른 컴포넌트가 준비된 뒤에야 시작할 수 있는 컴포넌트.
+# 보관 스레드는 database 단계가 만들거나 바꾸는 컬럼(clip_id, snapshot_hash)을 바로 읽는다
+STARTUP_DEPENDENCIES = {"archiver": ("database",)}
+component_status: Dict[str, str] = {name: "pending" for name in STARTUP_COMPONENTS}
+# 이 컴포넌트가 실패하면 요청을 받아도 제대로 처리할 수 없으므로 /ready가 503을 돌려준다.
+# 나머지는 실패해도 기능만 줄어든다 (영상, 보관, 시뮬레이터 등)
+REQUIRED_COMPONENTS = ("database", "event_bus")
+
+
+async def start_component(name: str, startup_func, dependency_tasks=()):
+    for task in dependency_tasks:
+        await task
+    not_ready = [dep for dep in STARTUP_DEPENDENCIES.get(name, ()) if component_status[dep] != "ready"]
+    if not_ready:
+        print(f"WARNING: {', '.join(not_ready)} 준비 실패로 {name}을(를) 시작하지 않습니다.")
+        component_status[name] = "unavailable"
+        return
 
+    try:
+        result = await asyncio.to_thread(startup_func)
+        if result is None:
+            component_status[name] = "disabled"
+        elif result is False:
+            component_status[name] = "unavailable"
+        else:
+            component_status[name] = "ready"
+    except Exception as e:
+        print(f"ERROR: {name} 초기화 실패: {e}")
+        component_status[name] = f"failed: {e}"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+
+    startup_tasks = {}
+    for name, startup_func in STARTUP_COMPONENTS.items():
+        dependency_tasks = [startup_tasks[dep] for dep in STARTUP_DEPENDENCIES.get(name, ())]
+        startup_tasks[name] = asyncio.create_task(start_component(name, startup_func, dependency_tasks))
+
+    yield
 
-app = FastAPI()
+    for task in startup_tasks.values():
+        task.cancel()
+    archiver.archiver_stop.set()
+    video_codec.stop_encoders()
+    event_bus.close()
+    await asyncio.to_thread(dependencies.stop_video_streamer)
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 app.add_middleware(
@@ -298,45 +535,190 @@ app.add_middleware(
 )
 
 
-@app.on_event("startup")
-async def startup_event():
-    global event_loop
-    event_loop = asyncio.get_event_loop()
-    check_db_and_create_table()
+@app.get("/ready")
+async def ready():
+    required = {name: component_status[name] for name in REQUIRED_COMPONENTS}
+    optional = {name: status for name, status in component_status.items() if name not in REQUIRED_COMPONENTS}
 
+    if any(status == "pending" for status in component_status.values()):
+        state = "starting"
+    elif all(status in ("ready", "disabled") for status in required.values()):
+        state = "ready"
+    else:
+        state = "unavailable"
 
-app.mount("/static", StaticFiles(directory="."), name="static")
+    body = {"status": state, "components": required, "optional_components": optional}
+    return JSONResponse(content=body, status_code=200 if state == "ready" else 503)
 
-@app.get("/", response_class=FileResponse)
-async def get_home():
-    return FileResponse("home.html") 
 
+def asset_response(request: Request, asset, cache_control: str):
+    status_code, body, headers = asset_pipeline.asset_response_parts(
+        asset,
+        request.headers.get("accept-encoding", ""),
+        request.headers.get("if-none-match"),
+        cache_control,
+    )
+    return Response(content=body, status_code=status_code, media_type=asset.content_type, headers=headers)
 
-@app.post("/detections/")
-async def receive_detection_data(detection_data: dict):
-    
-    ai_server_id = detection_data.get("ai_server_id", AI_SERVER_ID)
-    if "ai_server_id" not in detection_data:
-        detection_data["ai_server_id"] = ai_server_id 
-
-    global last_db_save_time
-    current_time = time.time()
-    last_save_time = last_db_save_time.get(ai_server_id, 0.0)
-
-    if current_time - last_save_time >= DB_SAVE_INTERVAL:
-        log_to_mysql(detection_data)
-        last_db_save_time[ai_server_id] = current_time
-        print(f"RECEIVED HTTP POST and DB SAVED: {detection_data.get('class_name')}. Next save in {DB_SAVE_INTERVAL}s.")
+
+def html_page_response(request: Request, page_name: str):
+    asset = asset_pipeline.get_html(page_name)
+    if asset is None:
+        return HTMLResponse(content="<h1>Page HTML File Not Found</h1>", status_code=404)
+    return asset_response(request, asset, asset_pipeline.REVALIDATE_CACHE_CONTROL)
+
+
+@app.get("/")
+async def get_home(request: Request):
+    return html_page_response(request, "home.html")
+
+
+@app.get("/user-settings")
+async def user_settings_page(request: Request):
+    return html_page_response(request, "user-settings.html")
+
+
+@app.get("/assets/{asset_name}")
+async def get_hashed_asset(asset_name: str, request: Request):
+    asset = asset_pipeline.get_asset(asset_name)
+    if asset is None:
+        return Response(status_code=404)
+    return asset_response(request, asset, asset_pipeline.IMMUTABLE_CACHE_CONTROL)
+
+
+@app.get("/static/{file_name}")
+async def get_static_file(file_name: str, request: Request):
+    if file_name.endswith(".html"):
+        return html_page_response(request, file_name)
+    asset = asset_pipeline.get_asset_by_name(file_name)
+    if asset is None:
+        return Response(status_code=404)
+    return asset_response(request, asset, asset_pipeline.REVALIDATE_CACHE_CONTROL)
+
+
+def start_incident_clip(event: DetectionEvent):
+    if not event.is_incident:
+        return
+
+    streamer = dependencies.get_streamer(event.camera_id)
+    if streamer is None:
+        return
+
+    new_clip_id = f"{datetime.now():%Y%m%d%H%M%S}_{uuid.uuid4().hex[:8]}"
+    clip_id = streamer.start_incident_clip(new_clip_id)
+    if clip_id:
+        event.clip_id = clip_id
+
+
+def capture_snapshot(log_row: dict, event: DetectionEvent):
+    # 썸네일은 클립 녹화 여부와 상관없이 화재/연기 행에만 만든다
+    if not (log_row["is_fire_detected"] or log_row["is_smoke_detected"]):
+        return
+
+    streamer = dependencies.get_streamer(event.camera_id)
+    frame = streamer.get_raw_frame() if streamer else None
+    if frame is None:
+        return
+
+    def on_stored(snapshot_hash):
+        update_snapshot_hash(log_row["id"], snapshot_hash)
+        # 행은 이미 버스로 나갔으므로, 모든 워커의 링에 있는 같은 행도 갱신하도록 알린다
+        update = {"id": log_row["id"], "snapshot_hash": snapshot_hash}
+        event_bus.publish(ALERT_ROW_UPDATES_CHANNEL, json_dumps(update), update)
+
+    submit_snapshot(frame, event.model_dump(include=BOX_FIELDS), on_stored)
+
+
+def publish_detection(event: DetectionEvent):
+    # seq는 버스의 공유 카운터에서 받아야 워커가 여러 개여도 겹치지 않는다
+    event.seq = event_bus.incr("detections:seq")
+    # 직렬화는 여기서 한 번만 한다. 이 문자열이 그대로 버스 → 링 → WebSocket으로 간다.
+    # 같은 프로세스 안의 구독자에게는 검증된 모델을 같이 넘겨서 다시 파싱하지 않게 한다
+    message = event.model_dump_json(exclude_none=True)
+    camera_id = (event.camera_id or "").replace("\t", " ")
+    event_bus.publish(DETECTIONS_CHANNEL, f"{event.seq}\t{camera_id}\t{message}", event)
+
+
+def is_duplicate_detection(ai_server_id: str, body: bytes):
+    # 감지기가 타임아웃 후 같은 payload를 다시 보내는 경우를 모든 워커에서 한 번만 처리한다
+    digest = hashlib.sha1(body).hexdigest()
+    return not event_bus.acquire(f"dedup:{ai_server_id}:{digest}", DEDUP_WINDOW)
+
+
+def process_detection(event: DetectionEvent, body: bytes):
+    ai_server_id = event.ai_server_id
+
+    if is_duplicate_detection(ai_server_id, body):
+        return {"status": "success", "message": "Duplicate detection ignored."}
+
+    start_incident_clip(event)
+
+    # 저장 주기는 버스의 SET NX PX 로 잡아서 워커가 여러 개여도 서버 ID당 한 번만 저장한다
+    if event_bus.acquire(f"db_save:{ai_server_id}", DB_SAVE_INTERVAL):
+        log_row = log_to_mysql(event)
+        if log_row:
+            log_row["timestamp"] = log_row["timestamp"].isoformat()
+            if log_row["is_fire_detected"] or log_row["is_smoke_detected"]:
+                event_bus.publish(ALERT_ROWS_CHANNEL, json_dumps(log_row), log_row)
+            capture_snapshot(log_row, event)
+        print(f"RECEIVED HTTP POST and DB SAVED: {event.class_name}. Next save in {DB_SAVE_INTERVAL}s.")
     else:
-        print(f"RECEIVED HTTP POST but DB SAVE SKIPPED (Interval not met): {detection_data.get('class_name')}")
-    
-    message = json.dumps(detection_data)
+        print(f"RECEIVED HTTP POST but DB SAVE SKIPPED (Interval not met): {event.class_name}")
     
-    await broadcast_detection(message)
+    publish_detection(event)
     
     return {"status": "success", "message": "Detection received and broadcasted."}
 
 
+@app.post("/detections/")
+async def receive_detection_data(request: Request):
+    # 본문은 dict를 거치지 않고 pydantic-core가 바로 검증하며 파싱한다
+    body = await request.body()
+    try:
+        event = DetectionEvent.model_validate_json(body)
+    except ValidationError as e:
+        return JSONResponse(
+            status_code=422,
+            content={"status": "error", "message": "Invalid detection payload.", "detail": e.errors(include_url=False, include_context=False)},
+        )
+
+    if event.ai_server_id is None:
+        event.ai_server_id = AI_SERVER_ID
+
+    # 감지 서버별 토큰 버킷 + 워커 전체 처리 중 상한. 화재/연기 이벤트는 별도 버킷과 남겨둔 자리를 쓴다
+    accepted, retry_after = admission.admit(event.ai_server_id, priority=event.is_incident)
+    if not accepted:
+        return JSONResponse(
+            status_code=429,
+            content={"status": "error", "message": "Too many detections. Retry later."},
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    # DB 저장·버스 발행은 블로킹이라 스레드에서 처리해서, 감지가 몰려도 다른 엔드포인트가 멈추지 않게 한다
+    try:
+        return await asyncio.to_thread(process_detection, event, body)
+    finally:
+        admission.release()
+
+
+@app.get("/admission/stats")
+async def get_admission_stats():
+    return {"status": "success", "data": admission.stats()}
+
+
+@app.post("/detector_stats/")
+async def receive_detector_stats(report: dict):
+    # 모든 워커가 같은 요약을 갖도록 버스로 돌린다 (소켓 I/O라 이벤트 루프 밖에서)
+    await asyncio.to_thread(event_bus.publish, DETECTOR_STATS_CHANNEL, json_dumps(report), report)
+    return {"status": "success"}
+
+
+@app.get("/detector_stats/")
+async def get_detector_stats():
+    prune_detector_stats(time.time())
+    return {"status": "success", "data": sorted(detector_stats.values(), key=lambda r: str(r.get("ai_server_id")))}
+
+
 @app.get("/get_today_counts") 
 async def get_today_counts():
     cnx = create_connection()
@@ -379,7 +761,14 @@ async def get_today_counts():
 
 
 @app.get("/get_logs/")
-async def get_filtered_logs():
+async def get_filtered_logs(limit: int = 100):
+    limit = max(1, min(limit, 1000))
+
+    # 최근 구간은 메모리 링에서 바로 응답해서, 재연결이 몰려도 DB까지 가지 않게 한다
+    recent_rows = recent_events.recent_alert_rows(limit)
+    if recent_rows is not None:
+        return {"status": "success", "data": recent_rows}
+
     cnx = create_connection()
     if not cnx:
         return {"status": "error", "message": "Database connection failed."}
@@ -390,11 +779,11 @@ async def get_filtered_logs():
         SELECT * FROM {TABLE_NAME}
         WHERE is_fire_detected = TRUE OR is_smoke_detected = TRUE
         ORDER BY timestamp DESC
-        LIMIT 100
+        LIMIT %s
     """
     
     try:
-        cursor.execute(sql)
+        cursor.execute(sql, (limit,))
         results = cursor.fetchall()
         
         for row in results:
@@ -411,7 +800,33 @@ async def get_filtered_logs():
         cnx.close()
 
 
+@app.get("/archive/detections")
+async def get_archived_detections(start: date, end: date, columns: str = None, class_name: str = None,
+                                  ai_server_id: str = None, limit: int = 1000):
+    if not archiver.ARCHIVE_ENABLED:
+        return {"status": "error", "message": "Archive is disabled (pyarrow not installed)."}
+
+    column_list = [c.strip() for c in columns.split(",")] if columns else None
+    try:
+        rows = await asyncio.to_thread(
+            archiver.query_archive, start, end, column_list, class_name, ai_server_id, min(limit, 100000)
+        )
+    except Exception as e:
+        print(f"ERROR: 보관 기록 조회 오류: {e}")
+        return {"status": "error", "message": f"Archive query failed: {e}"}
+
+    return {"status": "success", "data": rows}
+
+
 def generate_video_frames():
+    streamer = dependencies.get_streamer()
+    if streamer is not None:
+        # lifespan에서 이미 연 VideoStreamer가 있으면 카메라를 다시 열지 않고 그 프레임을 쓴다
+        while True:
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + streamer.get_frame() + b'\r\n')
+            time.sleep(1/30)
+
     camera = get_camera()
     
     while True:
@@ -438,12 +853,102 @@ async def video_feed():
     return StreamingResponse(generate_video_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
 
 
+@app.get("/clips/{clip_id}")
+async def get_clip(clip_id: str, request: Request):
+    path = clip_path(clip_id)
+    if path is None or not os.path.exists(path):
+        return Response(status_code=404)
+
+    file_size = os.path.getsize(path)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "public, max-age=86400"}
+
+    range_header = request.headers.get("range")
+    try:
+        byte_range = parse_range_header(range_header, file_size) if range_header else None
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{file_size}"})
+
+    # Range가 없거나 형식이 틀리면 무시하고 전체를 보낸다
+    if byte_range is None:
+        headers["Content-Length"] = str(file_size)
+        return StreamingResponse(iter_file_range(path, 0, file_size - 1), media_type="video/mp4", headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file_range(path, start, end), status_code=206, media_type="video/mp4", headers=headers)
+
+
+SNAPSHOT_CACHE_HEADERS = {"Cache-Control": "public, max-age=31536000, immutable"}
+MAX_SNAPSHOT_BATCH = 100
+
+
+def snapshot_urls(hashes: List[str]):
+    return {snapshot_hash: f"/snapshots/{snapshot_hash}" for snapshot_hash in hashes if snapshot_exists(snapshot_hash)}
+
+
+@app.get("/snapshots/batch")
+async def get_snapshot_batch(hashes: str):
+    # 이미지 내용 대신 URL을 돌려준다. 브라우저가 /snapshots/{hash}를 직접 받아야 ETag/immutable 캐시가 적용된다
+    hashes = [snapshot_hash.strip() for snapshot_hash in hashes.split(",")[:MAX_SNAPSHOT_BATCH] if snapshot_hash.strip()]
+    # 파일 확인은 이벤트 루프 밖에서 한다
+    data = await asyncio.to_thread(snapshot_urls, hashes)
+    return {"status": "success", "data": data}
+
+
+@app.get("/snapshots/{snapshot_hash}")
+async def get_snapshot(snapshot_hash: str, request: Request):
+    snapshot_hash = snapshot_hash.removesuffix(".jpg")
+    etag = f'"{snapshot_hash}"'
+
+    # 없는(또는 형식이 틀린) 해시에 304를 주면 안 되므로 존재부터 확인한다
+    if request.headers.get("if-none-match") == etag:
+        if await asyncio.to_thread(snapshot_exists, snapshot_hash):
+            return Response(status_code=304, headers={"ETag": etag, **SNAPSHOT_CACHE_HEADERS})
+        return Response(status_code=404)
+
+    content = await asyncio.to_thread(read_snapshot, snapshot_hash)
+    if content is None:
+        return Response(status_code=404)
+
+    return Response(content=content, media_type="image/jpeg", headers={"ETag": etag, **SNAPSHOT_CACHE_HEADERS})
+
+
+MAX_BACKFILL = 200
+
+
+@app.get("/video_feed/fmp4")
+async def video_feed_fmp4(camera_id: str = None):
+    # H.264 fragmented MP4 스트림. PyAV가 없거나 카메라가 없으면 MJPEG(/video_feed)를 쓰면 된다
+    if not video_codec.CODEC_AVAILABLE:
+        return JSONResponse(status_code=503, content={"status": "error", "message": "PyAV not installed.", "fallback": "/video_feed"})
+
+    streamer = dependencies.get_streamer(camera_id)
+    if streamer is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Camera not available.", "fallback": "/video_feed"})
+
+    encoder = video_codec.get_encoder(camera_id or dependencies.CAMERA_ID, streamer)
+    return StreamingResponse(encoder.iter_stream(), media_type='video/mp4; codecs="avc1.42E01E"',
+                             headers={"Cache-Control": "no-store"})
+
+
 @app.websocket("/ws/detections")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, since: int = None, backfill: int = 0):
     await websocket.accept()
+
+    # replay 목록을 뜨는 것과 클라이언트 등록 사이에 await가 없어야 그 사이 이벤트를 놓치지 않는다
+    if since is not None:
+        replay = recent_events.since(since)
+    else:
+        replay = recent_events.latest(min(backfill, MAX_BACKFILL))
     websocket_clients.add(websocket)
     print("WebSocket Connected")
     try:
+        if since is not None or backfill:
+            for message in replay:
+                await websocket.send_text(message)
+            await websocket.send_text(json_dumps({"type": "replay_end", "seq": recent_events.seq}))
+
         while True:
             await websocket.receive_text()
             
@@ -457,6 +962,34 @@ async def websocket_endpoint(websocket: WebSocket):
         except KeyError:
             pass
 
+@app.websocket("/ws/alerts")
+async def alerts_websocket(websocket: WebSocket, backfill: int = 0):
+    await websocket.accept()
+    replay = list(recent_alerts)[-backfill:] if backfill > 0 else []
+    alert_clients.add(websocket)
+    try:
+        for message in replay:
+            await websocket.send_text(message)
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Alert WebSocket Error: {e}")
+    finally:
+        alert_clients.discard(websocket)
+
+
+@app.get("/alerts/recent")
+async def get_recent_alerts(limit: int = Query(20, ge=1, le=RECENT_ALERTS)):
+    return {"status": "success", "data": [json_loads(message) for message in list(recent_alerts)[-limit:]][::-1]}
+
+
+@app.get("/{page_name}.html")
+async def get_html_page(page_name: str, request: Request):
+    return html_page_response(request, page_name + ".html")
+
+
 if __name__ == "__main__":
     print("\n--- AI 비디오 스트리밍/감지 서버 시작 ---")
     print(f"루트 (비디오 테스트): http://127.0.0.1:9000/")
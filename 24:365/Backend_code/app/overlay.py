@@ -0,0 +1,169 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# 감지 박스/라벨 오버레이.
+#  - 라벨은 (클래스, 신뢰도 구간)별로 한 번만 그려 sprite로 캐시하고, 프레임에는 NumPy 슬라이싱으로 붙인다.
+#  - 박스 테두리도 cv2 호출 없이 슬라이싱으로 칠한다.
+#  - 감지 결과는 TTL이 지나면 사라지고, 바뀔 때마다 version이 올라간다.
+#    감지기는 SUBMISSION_INTERVAL초마다 결과를 보내므로, TTL은 그 주기보다 조금 길어야 박스가 깜빡이지 않는다.
+
+COLOR_MAP = {
+    'fire': (0, 0, 255),
+    'smoke': (0, 165, 255),
+    'person': (255, 0, 0),
+    'car': (0, 255, 0),
+    'unknown': (255, 255, 255),
+}
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+LINE_THICKNESS = 2
+TEXT_SCALE = 0.7
+LABEL_PADDING = 5
+CONFIDENCE_BUCKET = 0.05
+# 감지기가 이벤트에 submission_interval을 실어 보내면 그 값을, 아니면 이 기본 주기를 쓴다
+DEFAULT_SUBMISSION_INTERVAL = float(os.getenv("SUBMISSION_INTERVAL", "10"))
+OVERLAY_TTL_FACTOR = 1.5
+OVERLAY_TTL = DEFAULT_SUBMISSION_INTERVAL * OVERLAY_TTL_FACTOR
+
+
+def overlay_ttl(submission_interval=None):
+    """다음 결과가 올 때까지 박스가 남아 있도록 전송 주기에 여유를 더한 TTL."""
+    if not submission_interval or submission_interval <= 0:
+        return OVERLAY_TTL
+    return float(submission_interval) * OVERLAY_TTL_FACTOR
+
+
+def confidence_bucket(confidence):
+    return round(int(float(confidence) / CONFIDENCE_BUCKET) * CONFIDENCE_BUCKET, 2)
+
+
+class SpriteCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sprites = {}
+
+    def label(self, object_type, bucket):
+        key = (object_type, bucket)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        color = COLOR_MAP.get(object_type, COLOR_MAP['unknown'])
+        text = f"{object_type}: {bucket:.2f}"
+        (text_w, text_h), baseline = cv2.getTextSize(text, FONT, TEXT_SCALE, LINE_THICKNESS)
+
+        sprite = np.empty((text_h + baseline + LABEL_PADDING, text_w + LABEL_PADDING * 2, 3), dtype=np.uint8)
+        sprite[:] = color
+        cv2.putText(sprite, text, (LABEL_PADDING, text_h + LABEL_PADDING // 2), FONT, TEXT_SCALE,
+                    (255, 255, 255), LINE_THICKNESS, cv2.LINE_AA)
+
+        with self.lock:
+            self.sprites[key] = sprite
+        return sprite
+
+
+sprite_cache = SpriteCache()
+
+
+def norm_value(det, *keys):
+    for key in keys:
+        val = det.get(key)
+        if val is not None:
+            try:
+                return float(val)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def box_pixels(det, W, H):
+    center_x = norm_value(det, 'location_x')
+    center_y = norm_value(det, 'location_y')
+    w_norm = norm_value(det, 'width_norm', 'box_width', 'box_w')
+    h_norm = norm_value(det, 'height_norm', 'box_height', 'box_h')
+
+    if None in (center_x, center_y, w_norm, h_norm) or w_norm <= 0 or h_norm <= 0:
+        return None
+
+    x1 = max(0, int((center_x - w_norm / 2) * W))
+    y1 = max(0, int((center_y - h_norm / 2) * H))
+    x2 = min(W, int((center_x + w_norm / 2) * W))
+    y2 = min(H, int((center_y + h_norm / 2) * H))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    return x1, y1, x2, y2
+
+
+def draw_box(frame, x1, y1, x2, y2, color, thickness=LINE_THICKNESS):
+    frame[y1:y1 + thickness, x1:x2] = color
+    frame[max(y1, y2 - thickness):y2, x1:x2] = color
+    frame[y1:y2, x1:x1 + thickness] = color
+    frame[y1:y2, max(x1, x2 - thickness):x2] = color
+
+
+def paste_sprite(frame, sprite, x, y):
+    (H, W) = frame.shape[:2]
+    (h, w) = sprite.shape[:2]
+    x1, y1 = max(0, x), max(0, y)
+    x2, y2 = min(W, x + w), min(H, y + h)
+    if x2 <= x1 or y2 <= y1:
+        return
+    frame[y1:y2, x1:x2] = sprite[y1 - y:y2 - y, x1 - x:x2 - x]
+
+
+def composite(frame, detections):
+    """frame 위에 감지 목록을 그린다 (frame을 직접 수정)."""
+    (H, W) = frame.shape[:2]
+    for det in detections:
+        box = box_pixels(det, W, H)
+        if box is None:
+            continue
+        x1, y1, x2, y2 = box
+
+        object_type = str(det.get('object_type') or det.get('class_name') or 'unknown').lower()
+        color = COLOR_MAP.get(object_type, COLOR_MAP['unknown'])
+        draw_box(frame, x1, y1, x2, y2, color)
+
+        sprite = sprite_cache.label(object_type, confidence_bucket(det.get('confidence', 0.0) or 0.0))
+        label_y = y1 - sprite.shape[0]
+        if label_y < 0:
+            label_y = y2
+        paste_sprite(frame, sprite, x1, label_y)
+    return frame
+
+
+class OverlayState:
+    """감지 서버(ai_server_id)별 최신 감지 결과와 만료 시각."""
+
+    def __init__(self, ttl=OVERLAY_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.version = 0
+
+    def update(self, key, detections, ttl=None):
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        with self.lock:
+            self.entries[key] = (list(detections), expires_at)
+            self.version += 1
+
+    def replace_all(self, detections_by_key: dict):
+        expires_at = time.time() + self.ttl
+        with self.lock:
+            self.entries = {key: (list(dets), expires_at) for key, dets in detections_by_key.items()}
+            self.version += 1
+
+    def active(self):
+        """(version, 감지 목록). 만료된 항목이 정리되면 version도 바뀐다."""
+        now = time.time()
+        with self.lock:
+            expired = [key for key, (_, expires_at) in self.entries.items() if expires_at <= now]
+            for key in expired:
+                del self.entries[key]
+            if expired:
+                self.version += 1
+            detections = [det for dets, _ in self.entries.values() for det in dets]
+            return self.version, detections
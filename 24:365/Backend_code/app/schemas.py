@@ -1,7 +1,11 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, field_validator, model_validator
 from datetime import datetime
 from typing import Optional
 
+# 스냅샷 크롭에 넘기는 박스 좌표 필드
+BOX_FIELDS = {"location_x", "location_y", "box_width", "box_height"}
+
+
 class DetectionCreate(BaseModel):
     ai_server_id: str = Field(..., description="데이터를 보낸 AI 서버의 고유 ID")
     object_type: str = Field(..., description="감지된 객체의 종류 (예: 'car', 'person')")
@@ -40,4 +44,50 @@ class Detection(DetectionCreate):
     detection_time: datetime
 
     class Config:
-        orm_mode = True 
\ No newline at end of file
+        orm_mode = True
+
+
+class DetectionEvent(BaseModel):
+    """/detections/ 로 들어오는 감지 이벤트.
+
+    감지기마다 다른 필드 이름(object_type/class_name, box_w/box_width)을 받아서 한 가지 형태로 맞춘다.
+    직렬화는 model_dump_json()으로 한 번만 하고, 그 문자열을 버스/링/WebSocket에서 그대로 쓴다.
+    """
+
+    model_config = ConfigDict(extra="ignore")
+
+    ai_server_id: Optional[str] = None
+    camera_id: Optional[str] = None
+    timestamp: datetime = Field(default_factory=datetime.now)
+    class_name: str = Field("UNKNOWN", validation_alias=AliasChoices("class_name", "object_type"))
+    confidence: float = Field(0.0, ge=0.0, le=1.0)
+    is_fire_detected: bool = False
+    is_smoke_detected: bool = False
+    location_x: Optional[float] = None
+    location_y: Optional[float] = None
+    box_width: Optional[float] = Field(None, validation_alias=AliasChoices("box_width", "box_w", "width_norm"))
+    box_height: Optional[float] = Field(None, validation_alias=AliasChoices("box_height", "box_h", "height_norm"))
+    clip_id: Optional[str] = None
+    seq: Optional[int] = None
+    # 감지기의 전송 주기(초). 영상 오버레이 박스를 얼마나 남길지 정하는 데 쓴다
+    submission_interval: Optional[float] = Field(None, gt=0)
+
+    @field_validator("ai_server_id", "camera_id", mode="before")
+    @classmethod
+    def id_to_str(cls, value):
+        return str(value) if value is not None else None
+
+    @field_validator("class_name")
+    @classmethod
+    def upper_class_name(cls, value):
+        return value.upper()
+
+    @model_validator(mode="after")
+    def flags_from_class_name(self):
+        self.is_fire_detected = self.is_fire_detected or self.class_name == "FIRE"
+        self.is_smoke_detected = self.is_smoke_detected or self.class_name == "SMOKE"
+        return self
+
+    @property
+    def is_incident(self):
+        return self.is_fire_detected or self.is_smoke_detected
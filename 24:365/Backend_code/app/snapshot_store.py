@@ -0,0 +1,113 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import cv2
+
+# 감지 썸네일 저장소: JPEG 크롭을 SHA-256 해시 이름으로 저장한다 (snapshots/ab/abcdef....jpg).
+# 내용이 같으면 이름도 같으므로 한 번 만든 파일은 절대 바뀌지 않는다.
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_JPEG_QUALITY = 85
+SNAPSHOT_PADDING = 0.15
+SNAPSHOT_WORKERS = 2
+HASH_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+executor = ThreadPoolExecutor(max_workers=SNAPSHOT_WORKERS, thread_name_prefix="snapshot")
+
+
+def snapshot_path(snapshot_hash):
+    if not HASH_PATTERN.match(snapshot_hash):
+        return None
+    return os.path.join(SNAPSHOT_DIR, snapshot_hash[:2], snapshot_hash + ".jpg")
+
+
+def crop_detection(frame, detection: dict):
+    (H, W) = frame.shape[:2]
+
+    def norm(*keys):
+        for key in keys:
+            val = detection.get(key)
+            if val is not None:
+                try:
+                    return float(val)
+                except (TypeError, ValueError):
+                    return None
+        return None
+
+    center_x = norm("location_x")
+    center_y = norm("location_y")
+    box_w = norm("box_width", "box_w", "width_norm")
+    box_h = norm("box_height", "box_h", "height_norm")
+
+    if None in (center_x, center_y, box_w, box_h) or box_w <= 0 or box_h <= 0:
+        return frame
+
+    box_w *= 1 + SNAPSHOT_PADDING * 2
+    box_h *= 1 + SNAPSHOT_PADDING * 2
+
+    x1 = max(0, int((center_x - box_w / 2) * W))
+    y1 = max(0, int((center_y - box_h / 2) * H))
+    x2 = min(W, int((center_x + box_w / 2) * W))
+    y2 = min(H, int((center_y + box_h / 2) * H))
+
+    if x2 <= x1 or y2 <= y1:
+        return frame
+    return frame[y1:y2, x1:x2]
+
+
+def store_snapshot(frame, detection: dict):
+    crop = crop_detection(frame, detection)
+    ret, jpeg = cv2.imencode('.jpg', crop, [cv2.IMWRITE_JPEG_QUALITY, SNAPSHOT_JPEG_QUALITY])
+    if not ret:
+        return None
+
+    data = jpeg.tobytes()
+    snapshot_hash = hashlib.sha256(data).hexdigest()
+    path = snapshot_path(snapshot_hash)
+
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    return snapshot_hash
+
+
+def submit_snapshot(frame, detection: dict, on_stored=None):
+    """크롭/인코딩/저장을 워커 풀에서 처리한다. 저장이 끝나면 on_stored(hash)를 호출한다."""
+
+    def task():
+        try:
+            snapshot_hash = store_snapshot(frame, detection)
+            if snapshot_hash and on_stored:
+                on_stored(snapshot_hash)
+            return snapshot_hash
+        except Exception as e:
+            print(f"❌ 스냅샷 저장 오류: {e}")
+            return None
+
+    return executor.submit(task)
+
+
+@lru_cache(maxsize=256)
+def read_snapshot_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def snapshot_exists(snapshot_hash):
+    path = snapshot_path(snapshot_hash)
+    return path is not None and os.path.exists(path)
+
+
+def read_snapshot(snapshot_hash):
+    # 없는 해시는 캐시하지 않는다 (나중에 저장이 끝나면 읽을 수 있어야 하므로)
+    path = snapshot_path(snapshot_hash)
+    if path is None or not os.path.exists(path):
+        return None
+    return read_snapshot_file(path)
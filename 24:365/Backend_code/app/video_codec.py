@@ -0,0 +1,268 @@
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+# MJPEG 대신 쓸 수 있는 H.264 fragmented MP4 스트리밍.
+# 카메라마다 인코더 하나가 libx264로 한 번만 인코딩하고, 결과 조각(moof+mdat)을 메모리 캐시에 둔다.
+# 시청자는 init 조각(ftyp+moov)과 최신 조각부터 받아서 <video>나 MSE로 바로 재생한다.
+# 인코더는 시청자 수를 세고, 시청자가 없는 채로 ENCODER_IDLE_SECONDS가 지나면 멈춘다.
+
+CODEC_AVAILABLE = av is not None
+FMP4_MOVFLAGS = "frag_keyframe+empty_moov+default_base_moof"
+SEGMENT_CACHE_SIZE = 30
+ENCODER_IDLE_SECONDS = 10.0
+# 응답 Content-Type에 광고하는 codecs="avc1.42E01E"(Constrained Baseline)와 맞춘다
+H264_PROFILE = "baseline"
+
+DEFAULT_CODEC_SETTINGS = {
+    "fps": 15,
+    "keyint": 15,          # 키프레임 간격(프레임). 조각 하나 = GOP 하나라서 지연시간이 된다
+    "bitrate": 800_000,
+    "preset": "veryfast",
+}
+
+# 예: CODEC_CONFIG='{"0": {"bitrate": 1500000, "keyint": 30}}'
+CAMERA_CODEC_SETTINGS = json.loads(os.getenv("CODEC_CONFIG", "{}"))
+
+
+def codec_settings(camera_id):
+    settings = dict(DEFAULT_CODEC_SETTINGS)
+    settings.update(CAMERA_CODEC_SETTINGS.get(str(camera_id), {}))
+    return settings
+
+
+class BoxSplitter:
+    """muxer 출력을 MP4 최상위 box 단위로 잘라서 on_box(type, bytes)로 넘기는 file-like 객체."""
+
+    def __init__(self, on_box):
+        self.on_box = on_box
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= 8:
+            size = struct.unpack(">I", self.buffer[:4])[0]
+            header_size = 8
+            if size == 1:
+                if len(self.buffer) < 16:
+                    break
+                size = struct.unpack(">Q", self.buffer[8:16])[0]
+                header_size = 16
+            if size < header_size or len(self.buffer) < size:
+                break
+            box_type = bytes(self.buffer[4:8])
+            box = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            self.on_box(box_type, box)
+        return len(data)
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        pass
+
+
+class Fmp4Encoder:
+    def __init__(self, camera_id, streamer, settings):
+        self.camera_id = str(camera_id)
+        self.streamer = streamer
+        self.settings = settings
+
+        self.lock = threading.Lock()
+        self.waiters = set()  # (이벤트 루프, asyncio.Event): 새 조각이 생기면 깨울 시청자
+        self.init_segment = None
+        self.fragments = deque(maxlen=SEGMENT_CACHE_SIZE)
+        self.fragment_seq = 0
+        self.pending_init = b""
+        self.pending_fragment = b""
+        self.viewers = 0
+        self.idle_since = time.time()
+        self.stopped = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def notify(self):
+        # 인코더 스레드에서 불린다. 시청자는 각자의 이벤트 루프에서 기다리므로 call_soon_threadsafe로 깨운다
+        with self.lock:
+            waiters = list(self.waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass
+
+    def on_box(self, box_type, box):
+        if box_type in (b"ftyp", b"moov"):
+            self.pending_init += box
+            if box_type == b"moov":
+                with self.lock:
+                    self.init_segment = self.pending_init
+                self.notify()
+        elif box_type == b"moof":
+            self.pending_fragment = box
+        elif box_type == b"mdat":
+            with self.lock:
+                self.fragment_seq += 1
+                self.fragments.append((self.fragment_seq, self.pending_fragment + box))
+            self.pending_fragment = b""
+            self.notify()
+
+    def add_viewer(self):
+        with encoders_lock:
+            self.viewers += 1
+
+    def remove_viewer(self):
+        with encoders_lock:
+            self.viewers -= 1
+            if self.viewers == 0:
+                self.idle_since = time.time()
+
+    def idle_expired(self):
+        """시청자 없이 ENCODER_IDLE_SECONDS가 지났으면 목록에서 빼고 멈춘다. get_encoder와 같은 lock을 써서
+        방금 붙은 시청자가 멈출 인코더를 받는 일이 없게 한다."""
+        with encoders_lock:
+            if self.viewers > 0 or time.time() - self.idle_since < ENCODER_IDLE_SECONDS:
+                return False
+            self.stopped = True
+            if encoders.get(self.camera_id) is self:
+                del encoders[self.camera_id]
+        print(f"💤 카메라 {self.camera_id} 시청자가 없어 H.264 인코더를 멈춥니다.")
+        return True
+
+    def run(self):
+        fps = self.settings["fps"]
+        frame = None
+        while frame is None and not self.stopped and not self.idle_expired():
+            frame = self.streamer.get_raw_frame()
+            if frame is None:
+                time.sleep(0.1)
+        if frame is None:
+            self.notify()
+            return
+
+        height, width = frame.shape[:2]
+        container = av.open(BoxSplitter(self.on_box), mode="w", format="mp4",
+                            options={"movflags": FMP4_MOVFLAGS})
+        stream = container.add_stream("libx264", rate=fps)
+        stream.width = width - width % 2
+        stream.height = height - height % 2
+        stream.pix_fmt = "yuv420p"
+        stream.bit_rate = self.settings["bitrate"]
+        stream.options = {
+            "profile": H264_PROFILE,
+            "g": str(self.settings["keyint"]),
+            "keyint_min": str(self.settings["keyint"]),
+            "sc_threshold": "0",
+            "preset": self.settings["preset"],
+            "tune": "zerolatency",
+        }
+
+        print(f"✅ 카메라 {self.camera_id} H.264 fMP4 인코더 시작 ({stream.width}x{stream.height}, {fps}fps, "
+              f"keyint {self.settings['keyint']}, {self.settings['bitrate'] // 1000}kbps)")
+
+        interval = 1.0 / fps
+        next_time = time.time()
+        pts = 0
+        try:
+            while not self.stopped and not self.idle_expired():
+                frame = self.streamer.get_raw_frame()
+                if frame is not None:
+                    video_frame = av.VideoFrame.from_ndarray(
+                        np.ascontiguousarray(frame[:stream.height, :stream.width]), format="bgr24")
+                    video_frame.pts = pts
+                    pts += 1
+                    for packet in stream.encode(video_frame):
+                        container.mux(packet)
+
+                next_time += interval
+                time.sleep(max(0.0, next_time - time.time()))
+        finally:
+            for packet in stream.encode():
+                container.mux(packet)
+            container.close()
+            self.notify()
+
+    async def wait_for(self, event, predicate, timeout):
+        """predicate가 참이 될 때까지 스레드를 잡지 않고 기다린다. timeout초 동안 새 조각이 없으면 False."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            # 확인하기 전에 clear 해야 그 사이에 온 알림을 놓치지 않는다
+            event.clear()
+            with self.lock:
+                if predicate():
+                    return True
+            remaining = deadline - loop.time()
+            if self.stopped or remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def iter_stream(self, timeout=5.0):
+        """init 조각을 먼저 보내고, 가장 최근 조각부터 새 조각이 생길 때마다 보낸다."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.lock:
+            self.waiters.add(waiter)
+        self.add_viewer()
+        try:
+            if not await self.wait_for(waiter[1], lambda: self.init_segment is not None, timeout):
+                return
+            with self.lock:
+                init_segment = self.init_segment
+                last_seq = self.fragments[-1][0] - 1 if self.fragments else self.fragment_seq
+
+            yield init_segment
+
+            while not self.stopped:
+                if not await self.wait_for(waiter[1], lambda: self.fragment_seq > last_seq, timeout):
+                    return
+                # 느린 시청자가 놓쳐 캐시에서 밀려난 조각은 건너뛴다.
+                # 조각마다 키프레임으로 시작하므로 재생은 끊기지 않고 이어진다.
+                with self.lock:
+                    pending = [fragment for fragment in self.fragments if fragment[0] > last_seq]
+                for seq, data in pending:
+                    last_seq = seq
+                    yield data
+        finally:
+            with self.lock:
+                self.waiters.discard(waiter)
+            self.remove_viewer()
+
+    def stop(self):
+        self.stopped = True
+        self.notify()
+
+
+encoders = {}
+encoders_lock = threading.Lock()
+
+
+def get_encoder(camera_id, streamer):
+    camera_id = str(camera_id)
+    with encoders_lock:
+        encoder = encoders.get(camera_id)
+        if encoder is None or not encoder.thread.is_alive():
+            encoder = encoders[camera_id] = Fmp4Encoder(camera_id, streamer, codec_settings(camera_id))
+        return encoder
+
+
+def stop_encoders():
+    with encoders_lock:
+        for encoder in encoders.values():
+            encoder.stop()
+        encoders.clear()
@@ -1,33 +1,59 @@
 import cv2
+import queue
 import threading
+from collections import deque
 import time
 import numpy as np
 
-COLOR_MAP = {
-    'fire': (0, 0, 255),
-    'smoke': (0, 165, 255),
-    'person': (255, 0, 0),
-    'car': (0, 255, 0),
-    'unknown': (255, 255, 255),
-}
-FONT = cv2.FONT_HERSHEY_SIMPLEX
-LINE_THICKNESS = 2
-TEXT_SCALE = 0.7
+try:
+    from app.frame_bus import open_capture
+    from app.clip_recorder import get_clip_writer
+    from app.overlay import OverlayState, composite
+except ImportError:
+    from frame_bus import open_capture
+    from clip_recorder import get_clip_writer
+    from overlay import OverlayState, composite
+
+STREAM_JPEG_QUALITY = 90
+
+# 사건 전 영상 링 버퍼: 카메라마다 최근 PRE_EVENT_SECONDS초의 JPEG 프레임만 고정 크기로 보관
+PRE_EVENT_SECONDS = 10
+POST_EVENT_SECONDS = 10
+CLIP_FPS = 10
+CLIP_JPEG_QUALITY = 80
+CLIP_RING_MAX_BYTES = 32 * 1024 * 1024
+# 캡처 스레드는 CLIP_FPS로 고른 원본 프레임을 넘기기만 하고, JPEG 인코딩은 클립 스레드가 한다.
+# 인코딩이 밀려 이만큼 쌓이면 새 프레임은 버린다
+CLIP_ENCODE_QUEUE = CLIP_FPS
+
+# 카메라 읽기가 잠깐 실패하는 건 다시 시도하고, 계속 실패하면 장치를 다시 연다
+READ_RETRY_DELAY = 0.1
+REOPEN_AFTER_FAILURES = 50
 
 class VideoStreamer:
     def __init__(self, src=0):
         self.stream = None
         try:
-            self.stream = cv2.VideoCapture(src)
+            self.stream = open_capture(src)
         except Exception as e:
-            print(f"🚨🚨 cv2.VideoCapture({src}) 초기화 중 오류 발생: {e}")
+            print(f"🚨🚨 open_capture({src}) 초기화 중 오류 발생: {e}")
 
         self.src = src
         self.lock = threading.Lock()
         self.frame = None
+        self.frame_id = 0
         self.stopped = False
 
-        self.current_detections = {}
+        # 오버레이와 JPEG 인코딩은 (frame_id, 오버레이 version)당 한 번만 하고 모든 시청자가 공유한다
+        self.overlay = OverlayState()
+        self.encode_lock = threading.Lock()
+        self.encoded = (None, None)
+
+        self.clip_ring = deque(maxlen=PRE_EVENT_SECONDS * CLIP_FPS)
+        self.clip_ring_bytes = 0
+        self.last_clip_frame_time = 0.0
+        self.active_clip = None
+        self.clip_frames = queue.Queue(maxsize=CLIP_ENCODE_QUEUE)
 
         if not self.stream or not self.stream.isOpened():
             print(f"🚨🚨 Camera {src} failed to open.")
@@ -37,100 +63,164 @@ class VideoStreamer:
         self.thread = threading.Thread(target=self.update, args=())
         self.thread.daemon = True
         self.thread.start()
+        self.clip_thread = threading.Thread(target=self.clip_encode_loop, daemon=True)
+        self.clip_thread.start()
 
-        time.sleep(1.0)
         print(f"✅ VideoStreamer initialized for source {src}.")
 
     def set_detections(self, detections: dict):
-        with self.lock:
-            self.current_detections = detections.copy()
+        self.overlay.replace_all(detections)
+
+    def add_detections(self, server_id, detections: list, ttl=None):
+        """감지 서버 하나의 최신 감지 결과를 갱신한다. ttl초 뒤 화면에서 사라진다."""
+        self.overlay.update(server_id, detections, ttl)
+
+    def reopen(self):
+        print(f"⚠️ Camera {self.src} 읽기가 계속 실패해 다시 엽니다.")
+        try:
+            self.stream.release()
+            stream = open_capture(self.src)
+        except Exception as e:
+            print(f"🚨🚨 open_capture({self.src}) 다시 열기 실패: {e}")
+            return
+        self.stream = stream
 
     def update(self):
+        failures = 0
         while not self.stopped:
             if self.stream and self.stream.isOpened():
                 (grabbed, frame) = self.stream.read()
                 if not grabbed:
-                    self.stopped = True
-                    break
+                    failures += 1
+                    if failures >= REOPEN_AFTER_FAILURES:
+                        self.reopen()
+                        failures = 0
+                    time.sleep(READ_RETRY_DELAY)
+                    continue
+                failures = 0
 
                 with self.lock:
                     self.frame = frame
+                    self.frame_id += 1
+
+                self.record_clip_frame(frame)
             else:
-                time.sleep(0.1)
+                failures += 1
+                if self.stream is not None and failures >= REOPEN_AFTER_FAILURES:
+                    self.reopen()
+                    failures = 0
+                time.sleep(READ_RETRY_DELAY)
 
         if self.stream:
             self.stream.release()
             print(f"✅ Camera {self.src} stream released.")
 
-    def draw_detections(self, frame, detections: dict):
-        if frame is None or not detections:
-            return frame
-
-        (H, W) = frame.shape[:2]
-
-        for server_id, detection_list in detections.items():
-            for det in detection_list:
-                try:
-                    center_x_norm = det.get('location_x')
-                    center_y_norm = det.get('location_y')
-                    w_norm = det.get('width_norm')
-                    h_norm = det.get('height_norm')
-
-                    object_type = det.get('object_type', 'unknown')
-                    confidence = det.get('confidence', 0.0)
-
-                    if center_x_norm is None or center_y_norm is None or w_norm is None or h_norm is None:
-                        continue
-
-                    center_x = int(center_x_norm * W)
-                    center_y = int(center_y_norm * H)
-
-                    box_w = int(w_norm * W)
-                    box_h = int(h_norm * H)
-
-                    x1 = max(0, int(center_x - box_w / 2))
-                    y1 = max(0, int(center_y - box_h / 2))
-                    x2 = min(W, int(center_x + box_w / 2))
-                    y2 = min(H, int(center_y + box_h / 2))
+    def record_clip_frame(self, frame):
+        # 캡처 스레드에서 불린다. 프레임 배열은 읽을 때마다 새로 만들어지므로 복사 없이 넘긴다
+        now = time.time()
+        if now - self.last_clip_frame_time < 1.0 / CLIP_FPS:
+            return
+        self.last_clip_frame_time = now
 
-                    color = COLOR_MAP.get(object_type, COLOR_MAP['unknown'])
-                    label = f"{object_type}: {confidence:.2f}"
+        try:
+            self.clip_frames.put_nowait((now, frame))
+        except queue.Full:
+            pass
 
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, LINE_THICKNESS)
+    def clip_encode_loop(self):
+        while not self.stopped:
+            try:
+                now, frame = self.clip_frames.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, CLIP_JPEG_QUALITY])
+            if ret:
+                self.add_clip_entry((now, jpeg.tobytes()))
 
-                    (text_w, text_h), baseline = cv2.getTextSize(label, FONT, TEXT_SCALE, LINE_THICKNESS)
+    def add_clip_entry(self, entry):
+        now = entry[0]
 
-                    text_y = y1 - text_h - 10
-                    if text_y < 0:
-                        text_y = y2 + text_h + 10
+        finished = None
+        with self.lock:
+            if len(self.clip_ring) == self.clip_ring.maxlen:
+                self.clip_ring_bytes -= len(self.clip_ring[0][1])
+            self.clip_ring.append(entry)
+            self.clip_ring_bytes += len(entry[1])
+            while self.clip_ring_bytes > CLIP_RING_MAX_BYTES and len(self.clip_ring) > 1:
+                self.clip_ring_bytes -= len(self.clip_ring.popleft()[1])
+
+            if self.active_clip is not None:
+                self.active_clip["frames"].append(entry)
+                if now >= self.active_clip["until"]:
+                    finished = self.active_clip
+                    self.active_clip = None
+
+        if finished is not None:
+            get_clip_writer().submit(finished["clip_id"], finished["frames"], CLIP_FPS)
+
+    def start_incident_clip(self, clip_id):
+        """링 버퍼 내용 + 이후 POST_EVENT_SECONDS초를 클립으로 남긴다.
+
+        이미 녹화 중인 사건이 있으면 새 클립을 만들지 않고 그 클립 ID를 돌려준다.
+        """
+        if self.stream is None:
+            return None
 
-                    cv2.rectangle(frame, (x1, text_y - text_h), (x1 + text_w + 10, text_y + baseline), color, -1)
-                    cv2.putText(frame, label, (x1 + 5, text_y), FONT, TEXT_SCALE, (255, 255, 255), LINE_THICKNESS, cv2.LINE_AA)
+        with self.lock:
+            if self.active_clip is not None:
+                return self.active_clip["clip_id"]
 
-                except Exception as e:
-                    print(f"⚠️ 바운딩 박스 그리기 중 런타임 오류: {e}")
-                    continue
+            self.active_clip = {
+                "clip_id": clip_id,
+                "frames": list(self.clip_ring),
+                "until": time.time() + POST_EVENT_SECONDS,
+            }
+            return clip_id
 
-        return frame
+    def draw_detections(self, frame, detections: dict):
+        if frame is None or not detections:
+            return frame
+        return composite(frame, [det for detection_list in detections.values() for det in detection_list])
 
-    def get_frame(self):
+    def get_raw_frame(self):
         with self.lock:
             if self.frame is None:
-                return self.get_black_frame()
-
-            processed_frame = self.frame.copy()
-
-            if self.current_detections:
-                 processed_frame = self.draw_detections(processed_frame, self.current_detections)
-
-            ret, jpeg = cv2.imencode('.jpg', processed_frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+                return None
+            return self.frame.copy()
 
-            if ret:
-                return jpeg.tobytes()
-            else:
+    def get_frame(self):
+        with self.lock:
+            frame_id = self.frame_id
+        if frame_id == 0:
+            return self.get_black_frame()
+
+        version, detections = self.overlay.active()
+        key = (frame_id, version)
+        encoded_key, encoded_jpeg = self.encoded
+        if encoded_key == key:
+            return encoded_jpeg
+
+        with self.encode_lock:
+            # 기다리는 동안 다른 시청자가 같은 프레임을 이미 인코딩했을 수 있다
+            encoded_key, encoded_jpeg = self.encoded
+            if encoded_key == key:
+                return encoded_jpeg
+
+            with self.lock:
+                frame = self.frame.copy()
+                key = (self.frame_id, version)
+
+            if detections:
+                frame = composite(frame, detections)
+
+            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, STREAM_JPEG_QUALITY])
+            if not ret:
                 print("❌ JPEG 인코딩 실패!")
                 return self.get_black_frame()
 
+            self.encoded = (key, jpeg.tobytes())
+            return self.encoded[1]
+
     def get_black_frame(self):
         black_image = np.zeros((360, 480, 3), dtype=np.uint8)
         text = "NO VIDEO STREAM / CAM FAILED"
@@ -149,5 +239,7 @@ class VideoStreamer:
 
     def stop(self):
         self.stopped = True
-        if self.thread.is_alive():
-            self.thread.join()
\ No newline at end of file
+        if hasattr(self, "thread") and self.thread.is_alive():
+            self.thread.join()
+        if hasattr(self, "clip_thread") and self.clip_thread.is_alive():
+            self.clip_thread.join()
\ No newline at end of file
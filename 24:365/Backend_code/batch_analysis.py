@@ -0,0 +1,342 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import cv2
+from ultralytics import YOLO
+
+from app import archiver
+from yolo_detector import FIRE_CLASS_NAMES, SMOKE_CLASS_NAMES, process_results
+
+# 녹화 영상 오프라인 분석.
+# 영상 파일을 프레임 구간(chunk)으로 나눠 프로세스 풀에 나눠 주고, 프로세스마다 모델을 한 번만 올려서
+# 실시간 간격(sleep/전송 주기) 없이 끝까지 추론한다. 결과는 구간마다 Parquet 파일로 쓰거나 MySQL에 한 번에 넣는다.
+#
+#   python batch_analysis.py recordings/*.mp4 --workers 8 --output parquet --out-dir batch_results
+#   python batch_analysis.py a.mp4 b.mp4 --start-time a.mp4=2025-03-14T10:00:00 --start-time b.mp4=2025-03-14T11:00:00
+
+MODEL_PATH = 'best24365.pt'
+CHUNK_SECONDS = 300
+INFERENCE_BATCH_SIZE = 16
+INFERENCE_CONF = 0.5
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+BATCH_OUT_DIR = "batch_results"
+BATCH_AI_SERVER_ID = "batch"
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST"),
+    "user": os.getenv("DB_USER"),
+    "password": os.getenv("DB_PASS"),
+    "database": os.getenv("DB_NAME"),
+}
+TABLE_NAME = "detection"
+
+if archiver.ARCHIVE_ENABLED:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # 보관 계층과 같은 컬럼에, 어느 영상의 몇 번째 프레임인지를 더한다
+    BATCH_SCHEMA = pa.schema(
+        [field for field in archiver.ARCHIVE_SCHEMA if field.name not in ("id", "clip_id", "snapshot_hash")]
+        + [pa.field("video", pa.string()), pa.field("frame_index", pa.int64()), pa.field("video_time", pa.float32())]
+    )
+
+
+def find_videos(inputs):
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            videos.extend(sorted(
+                os.path.join(item, name) for name in os.listdir(item) if name.lower().endswith(VIDEO_EXTENSIONS)
+            ))
+        else:
+            videos.extend(sorted(glob.glob(item)) or [item])
+    return videos
+
+
+def plan_chunks(video_path, chunk_seconds=CHUNK_SECONDS, start_time=None):
+    """영상 하나를 (경로, 시작 프레임, 끝 프레임, fps, 녹화 시작 시각) 구간 목록으로 나눈다."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"🚨 영상을 열 수 없습니다: {video_path}")
+        return []
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    if frame_count <= 0:
+        print(f"🚨 프레임 수를 알 수 없는 영상은 건너뜁니다: {video_path}")
+        return []
+
+    if start_time is None:
+        # 녹화 파일의 수정 시각은 녹화가 끝난 시각이므로 영상 길이만큼 앞으로 당긴다
+        start_time = datetime.fromtimestamp(os.path.getmtime(video_path)) - timedelta(seconds=frame_count / fps)
+
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    return [
+        (video_path, start, min(start + chunk_frames, frame_count), fps, start_time)
+        for start in range(0, frame_count, chunk_frames)
+    ]
+
+
+worker_model = None
+worker_settings = {}
+
+
+def init_worker(model_path, conf, stride, device, threads_per_worker):
+    """프로세스마다 한 번: 모델을 올리고, 프로세스끼리 코어를 두고 다투지 않도록 내부 스레드 수를 줄인다."""
+    global worker_model, worker_settings
+    cv2.setNumThreads(1)
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    worker_model = YOLO(model_path)
+    worker_settings = {"conf": conf, "stride": stride, "device": device}
+
+
+def detection_rows(results, video_path, frame_index, fps, start_time, ai_server_id):
+    details, _, _ = process_results(results, worker_model.names)
+    video_time = frame_index / fps
+    timestamp = start_time + timedelta(seconds=video_time)
+
+    rows = []
+    for det in details:
+        class_name = det["object_type"].lower()
+        rows.append({
+            "timestamp": timestamp,
+            "ai_server_id": ai_server_id,
+            "class_name": class_name.upper(),
+            "confidence": det["confidence"],
+            "is_fire_detected": class_name in FIRE_CLASS_NAMES,
+            "is_smoke_detected": class_name in SMOKE_CLASS_NAMES,
+            "location_x": det["location_x"],
+            "location_y": det["location_y"],
+            "box_width": det["box_w"],
+            "box_height": det["box_h"],
+            "video": os.path.basename(video_path),
+            "frame_index": frame_index,
+            "video_time": video_time,
+        })
+    return rows
+
+
+def write_chunk_parquet(rows, video_path, start, end, out_dir):
+    video_dir = os.path.join(out_dir, os.path.splitext(os.path.basename(video_path))[0])
+    os.makedirs(video_dir, exist_ok=True)
+
+    columns = {name: [row.get(name) for row in rows] for name in BATCH_SCHEMA.names}
+    table = pa.Table.from_pydict(columns, schema=BATCH_SCHEMA)
+
+    path = os.path.join(video_dir, f"frames-{start:08d}-{end:08d}.parquet")
+    tmp_path = os.path.join(video_dir, f".frames-{start:08d}-{end:08d}.tmp")
+    pq.write_table(table, tmp_path, compression=archiver.ARCHIVE_COMPRESSION)
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_chunk_mysql(rows):
+    if not rows:
+        return
+    # MySQL 출력을 쓸 때만 필요하므로, Parquet만 쓰는 환경에서는 설치하지 않아도 되게 여기서 가져온다
+    import mysql.connector
+
+    cnx = mysql.connector.connect(**DB_CONFIG, use_pure=True)
+    cursor = cnx.cursor()
+    try:
+        cursor.executemany(
+            f"""
+            INSERT INTO {TABLE_NAME}
+            (timestamp, ai_server_id, class_name, confidence, is_fire_detected, is_smoke_detected, location_x, location_y, box_width, box_height)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            [
+                (row["timestamp"], row["ai_server_id"], row["class_name"], row["confidence"],
+                 row["is_fire_detected"], row["is_smoke_detected"], row["location_x"], row["location_y"],
+                 row["box_width"], row["box_height"])
+                for row in rows
+            ],
+        )
+        cnx.commit()
+    except mysql.connector.Error:
+        cnx.rollback()
+        raise
+    finally:
+        cursor.close()
+        cnx.close()
+
+
+def analyze_chunk(chunk, output, out_dir, ai_server_id):
+    """워커 프로세스에서 구간 하나를 끝까지 추론하고 결과를 직접 저장한다. 부모에게는 개수만 돌려준다."""
+    video_path, start, end, fps, start_time = chunk
+    conf, stride, device = worker_settings["conf"], worker_settings["stride"], worker_settings["device"]
+    started = time.perf_counter()
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    rows = []
+    frames, indexes = [], []
+    inferred = 0
+
+    def flush():
+        nonlocal inferred
+        if not frames:
+            return
+        results_list = worker_model.predict(frames, conf=conf, device=device, verbose=False)
+        for frame_index, results in zip(indexes, results_list):
+            rows.extend(detection_rows(results, video_path, frame_index, fps, start_time, ai_server_id))
+        inferred += len(frames)
+        frames.clear()
+        indexes.clear()
+
+    for frame_index in range(start, end):
+        if (frame_index - start) % stride:
+            # 건너뛸 프레임은 디코딩 결과를 꺼내지 않는다
+            if not cap.grab():
+                break
+            continue
+
+        grabbed, frame = cap.read()
+        if not grabbed:
+            break
+        frames.append(frame)
+        indexes.append(frame_index)
+        if len(frames) >= INFERENCE_BATCH_SIZE:
+            flush()
+    flush()
+    cap.release()
+
+    if output == "mysql":
+        write_chunk_mysql(rows)
+    elif rows:
+        write_chunk_parquet(rows, video_path, start, end, out_dir)
+
+    return {
+        "video": video_path,
+        "start": start,
+        "end": end,
+        "frames": inferred,
+        "detections": len(rows),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def parse_start_time(value):
+    """'<영상>=<ISO 시각>' 또는 '<ISO 시각>'을 (영상 또는 None, datetime)으로 바꾼다."""
+    video, _, text = value.rpartition("=")
+    try:
+        return video or None, datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ISO 시각이 아닙니다: {text}")
+
+
+def video_start_time(video_path, start_times):
+    """영상별 녹화 시작 시각. 경로 또는 파일 이름으로 찾고, 없으면 None(파일 수정 시각으로 추정)."""
+    return start_times.get(video_path) or start_times.get(os.path.basename(video_path))
+
+
+def run_batch(videos, workers, chunk_seconds, output, out_dir, model_path, conf, stride, device, ai_server_id,
+              start_times=None):
+    start_times = start_times or {}
+    chunks = [
+        chunk for video in videos
+        for chunk in plan_chunks(video, chunk_seconds, video_start_time(video, start_times))
+    ]
+    if not chunks:
+        print("❌ 분석할 영상 구간이 없습니다.")
+        return None
+
+    total_frames = sum((end - start + stride - 1) // stride for _, start, end, _, _ in chunks)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    print(f"✅ 영상 {len(videos)}개 → 구간 {len(chunks)}개, 추론할 프레임 {total_frames}개, "
+          f"워커 {workers}개 (워커당 스레드 {threads_per_worker}), 출력: {output}")
+
+    started = time.perf_counter()
+    done_frames = 0
+    done_detections = 0
+    worker_seconds = 0.0
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(model_path, conf, stride, device, threads_per_worker),
+    ) as executor:
+        # 긴 구간부터 넣어야 마지막에 큰 구간 하나만 남아 코어가 노는 시간이 줄어든다
+        futures = [
+            executor.submit(analyze_chunk, chunk, output, out_dir, ai_server_id)
+            for chunk in sorted(chunks, key=lambda c: c[2] - c[1], reverse=True)
+        ]
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"❌ 구간 분석 실패: {e}")
+                continue
+
+            done_frames += result["frames"]
+            done_detections += result["detections"]
+            worker_seconds += result["seconds"]
+            elapsed = time.perf_counter() - started
+            fps = done_frames / elapsed if elapsed > 0 else 0.0
+            eta = (total_frames - done_frames) / fps if fps > 0 else 0.0
+            print(f"[{i}/{len(chunks)}] {os.path.basename(result['video'])} {result['start']}-{result['end']}: "
+                  f"{result['frames']}프레임, 감지 {result['detections']}개 | "
+                  f"전체 {done_frames}/{total_frames} ({fps:.1f} FPS, 남은 시간 약 {eta:.0f}초)")
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "chunks": len(chunks),
+        "frames": done_frames,
+        "detections": done_detections,
+        "seconds": round(elapsed, 2),
+        "fps": round(done_frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "fps_per_worker": round(done_frames / worker_seconds, 2) if worker_seconds > 0 else 0.0,
+        "parallel_efficiency": round(worker_seconds / (elapsed * workers), 2) if elapsed > 0 else 0.0,
+    }
+    print(f"📊 완료: 프레임 {report['frames']}개, 감지 {report['detections']}개, {report['seconds']}초, "
+          f"{report['fps']} FPS (워커당 {report['fps_per_worker']} FPS, 병렬 효율 {report['parallel_efficiency']:.0%})")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="녹화 영상을 여러 프로세스로 나눠 오프라인 분석합니다.")
+    parser.add_argument("inputs", nargs="+", help="영상 파일, glob 패턴 또는 영상이 들어 있는 디렉터리")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-seconds", type=float, default=CHUNK_SECONDS)
+    parser.add_argument("--output", choices=["parquet", "mysql"], default="parquet")
+    parser.add_argument("--out-dir", default=BATCH_OUT_DIR)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--conf", type=float, default=INFERENCE_CONF)
+    parser.add_argument("--stride", type=int, default=1, help="N프레임마다 한 번 추론")
+    parser.add_argument("--device", default=None, help="예: cpu, 0 (GPU)")
+    parser.add_argument("--ai-server-id", default=BATCH_AI_SERVER_ID)
+    parser.add_argument("--start-time", type=parse_start_time, action="append", default=[],
+                        help="영상별 녹화 시작 시각 '<영상 경로 또는 파일 이름>=<ISO 시각>' (여러 번 지정 가능). "
+                             "영상이 하나뿐이면 ISO 시각만 줘도 된다. 없는 영상은 파일 수정 시각에서 영상 길이를 뺀 값")
+    args = parser.parse_args()
+
+    if args.output == "parquet" and not archiver.ARCHIVE_ENABLED:
+        parser.error("Parquet 출력에는 pyarrow가 필요합니다. --output mysql을 쓰거나 pyarrow를 설치하세요.")
+
+    videos = find_videos(args.inputs)
+    start_times = {}
+    for video, start_time in args.start_time:
+        if video is None:
+            # 영상마다 시각이 다르므로, 영상 이름 없이 준 시각은 영상이 하나일 때만 받는다
+            if len(videos) != 1:
+                parser.error("영상이 여러 개면 --start-time은 '<영상>=<ISO 시각>' 형식으로 영상마다 지정하세요.")
+            video = videos[0]
+        start_times[video] = start_time
+
+    run_batch(videos, max(1, args.workers), args.chunk_seconds, args.output, args.out_dir, args.model, args.conf,
+              max(1, args.stride), args.device, args.ai_server_id, start_times)
+
+
+if __name__ == "__main__":
+    main()
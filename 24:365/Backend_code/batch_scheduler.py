@@ -0,0 +1,43 @@
+import os
+import time
+
+# 여러 카메라 중 이번 배치 추론에 넣을 카메라를 고른다.
+# 카메라 객체는 next_due / interval / priority 속성과 has_new_frame()만 있으면 되므로,
+# 모델(ultralytics)이나 캡처 없이도 가져다 쓸 수 있게 감지기 본체와 분리해 둔다.
+
+MAX_BATCH_SIZE = 8
+SCHEDULING_MODE = os.getenv("SCHEDULING_MODE", "round_robin")  # "round_robin" 또는 "priority"
+
+
+class BatchScheduler:
+    def __init__(self, cameras, max_batch_size=MAX_BATCH_SIZE, mode=SCHEDULING_MODE):
+        self.cameras = cameras
+        self.max_batch_size = max_batch_size
+        self.mode = mode
+        self.rr_index = 0
+
+    def next_batch(self):
+        now = time.time()
+        due = [cam for cam in self.cameras if cam.next_due <= now and cam.has_new_frame()]
+
+        if self.mode == "priority":
+            due.sort(key=lambda cam: (-cam.priority, cam.next_due))
+        else:
+            # 직전 배치가 끝난 카메라 다음부터 순서대로 돌아가며 선택
+            order = {id(cam): (i - self.rr_index) % len(self.cameras) for i, cam in enumerate(self.cameras)}
+            due.sort(key=lambda cam: order[id(cam)])
+
+        batch = due[:self.max_batch_size]
+        if batch and self.mode != "priority":
+            self.rr_index = (self.cameras.index(batch[-1]) + 1) % len(self.cameras)
+
+        for cam in batch:
+            # 밀린 주기는 몰아서 처리하지 않고, 늦었으면 지금부터 한 주기 뒤로 다시 맞춘다
+            cam.next_due = max(cam.next_due, now) + cam.interval
+
+        return batch
+
+    def wait_time(self):
+        if not self.cameras:
+            return 0.1
+        return max(0.0, min(cam.next_due for cam in self.cameras) - time.time())
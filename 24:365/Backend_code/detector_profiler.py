@@ -0,0 +1,259 @@
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import requests
+
+# 감지기 단계별 프로파일러.
+#  - read / predict / process / submit 단계 시간을 최근 ROLLING_WINDOW개씩 보관해서 p50/p95/p99 계산
+#  - REPORT_INTERVAL초마다 처리 FPS, 버린 프레임 수와 함께 요약을 만들어
+#    백엔드(/detector_stats/)로 보내거나 PROFILE_REPORT에 지정한 JSONL 파일에 한 줄씩 쓴다
+#  - 샘플링 프로파일러: --profile 또는 DETECTOR_PROFILE=1 이면 시작부터 켜고 종료할 때 덤프,
+#    실행 중에는 SIGUSR1로 켜고/끄면서(끌 때 덤프) 볼 수 있다. 시그널 핸들러는 요청 표시만 하고,
+#    실제 켜기/끄기와 덤프는 감지 루프가 check_toggle()을 부를 때 한다
+
+ROLLING_WINDOW = 500
+REPORT_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "30"))
+# "http"(기본): 백엔드로 전송 / "off": 끔 / 그 외: JSONL 파일 경로
+PROFILE_REPORT = os.getenv("PROFILE_REPORT", "http")
+DETECTOR_STATS_ENDPOINT = os.getenv("DETECTOR_STATS_ENDPOINT", "http://127.0.0.1:9000/detector_stats/")
+PROFILE_DUMP_DIR = os.getenv("PROFILE_DUMP_DIR", "profiles")
+SAMPLE_INTERVAL = 0.005
+TOP_FUNCTIONS = 15
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class StageProfiler:
+    def __init__(self, ai_server_id, source=None, window=ROLLING_WINDOW):
+        self.ai_server_id = ai_server_id
+        self.source = str(source) if source is not None else None
+        self.host = socket.gethostname()
+        self.lock = threading.Lock()
+        self.window = window
+        self.stages = {}
+
+        self.window_start = time.time()
+        self.frames = 0
+        self.dropped = 0
+        self.camera_frames = Counter()
+        self.camera_dropped = Counter()
+        self.total_frames = 0
+        self.total_dropped = 0
+
+    def record(self, stage, seconds):
+        with self.lock:
+            samples = self.stages.get(stage)
+            if samples is None:
+                samples = self.stages[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def frame_done(self, camera_id=None, count=1):
+        with self.lock:
+            self.frames += count
+            self.total_frames += count
+            if camera_id is not None:
+                self.camera_frames[str(camera_id)] += count
+
+    def frame_dropped(self, camera_id=None, count=1):
+        if count <= 0:
+            return
+        with self.lock:
+            self.dropped += count
+            self.total_dropped += count
+            if camera_id is not None:
+                self.camera_dropped[str(camera_id)] += count
+
+    def summary(self):
+        """지난 요약 이후 구간의 FPS/버린 프레임과 단계별 최근 지연 분포. 구간 카운터는 초기화된다."""
+        now = time.time()
+        with self.lock:
+            elapsed = max(now - self.window_start, 1e-6)
+            stages = {name: sorted(samples) for name, samples in self.stages.items()}
+            report = {
+                "ai_server_id": self.ai_server_id,
+                "source": self.source,
+                "host": self.host,
+                "pid": os.getpid(),
+                "timestamp": now,
+                "window_seconds": round(elapsed, 2),
+                "fps": round(self.frames / elapsed, 2),
+                "frames": self.frames,
+                "dropped_frames": self.dropped,
+                "total_frames": self.total_frames,
+                "total_dropped_frames": self.total_dropped,
+            }
+            if self.camera_frames or self.camera_dropped:
+                report["cameras"] = {
+                    camera_id: {
+                        "fps": round(self.camera_frames[camera_id] / elapsed, 2),
+                        "dropped_frames": self.camera_dropped[camera_id],
+                    }
+                    for camera_id in sorted(set(self.camera_frames) | set(self.camera_dropped))
+                }
+            self.window_start = now
+            self.frames = 0
+            self.dropped = 0
+            self.camera_frames.clear()
+            self.camera_dropped.clear()
+
+        report["stages"] = {
+            name: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for name, values in stages.items()
+        }
+        return report
+
+
+class StatsReporter:
+    """REPORT_INTERVAL마다 요약을 출력하고 내보낸다. 전송은 별도 스레드에서 해서 감지 루프 시간에 섞이지 않게 한다."""
+
+    def __init__(self, profiler, target=PROFILE_REPORT, interval=REPORT_INTERVAL):
+        self.profiler = profiler
+        self.target = target
+        self.interval = interval
+        self.next_report = time.time() + interval
+        self.session = requests.Session()
+
+    def maybe_report(self):
+        if self.target == "off" or time.time() < self.next_report:
+            return
+        self.next_report = time.time() + self.interval
+
+        report = self.profiler.summary()
+        stage_text = ", ".join(
+            f"{name} p50 {s['p50_ms']}ms/p95 {s['p95_ms']}ms/p99 {s['p99_ms']}ms"
+            for name, s in report["stages"].items()
+        )
+        print(f"📊 [프로파일] {report['fps']} FPS, 버린 프레임 {report['dropped_frames']} | {stage_text}")
+        threading.Thread(target=self.publish, args=(report,), daemon=True).start()
+
+    def publish(self, report):
+        if self.target == "http":
+            try:
+                self.session.post(DETECTOR_STATS_ENDPOINT, json=report, timeout=2)
+            except requests.exceptions.RequestException as e:
+                print(f"⚠️ 프로파일 요약 전송 실패: {e}")
+        else:
+            with open(self.target, "a") as f:
+                f.write(json.dumps(report) + "\n")
+
+
+class SamplingProfiler:
+    """대상 스레드의 호출 스택을 주기적으로 찍어서 folded stack(플레임 그래프 입력 형식)으로 모은다."""
+
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.main_thread().ident
+        self.interval = interval
+        self.counts = Counter()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.toggle_requested = False
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self.counts.clear()
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        print("🔬 샘플링 프로파일러 시작")
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def request_toggle(self):
+        # 시그널 핸들러에서 부른다. join/파일 쓰기/print는 여기서 하지 않는다
+        self.toggle_requested = True
+
+    def check_toggle(self):
+        """감지 루프에서 주기적으로 부른다. SIGUSR1 요청이 있었으면 켜거나, 멈추고 덤프한다."""
+        if not self.toggle_requested:
+            return
+        self.toggle_requested = False
+        if self.running:
+            self.stop()
+            self.dump()
+        else:
+            self.start()
+
+    def dump(self, dump_dir=PROFILE_DUMP_DIR):
+        counts = dict(self.counts)
+        if not counts:
+            print("🔬 샘플링 프로파일러: 모인 샘플이 없습니다.")
+            return None
+
+        os.makedirs(dump_dir, exist_ok=True)
+        path = os.path.join(dump_dir, f"detector-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w") as f:
+            for stack, count in sorted(counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+        total = sum(counts.values())
+        self_time = Counter()
+        for stack, count in counts.items():
+            self_time[stack.rsplit(";", 1)[-1]] += count
+        print(f"🔬 샘플 {total}개를 {path}에 저장했습니다. 자체 시간 상위 함수:")
+        for name, count in self_time.most_common(TOP_FUNCTIONS):
+            print(f"   {count / total * 100:5.1f}%  {name}")
+        return path
+
+
+def setup_sampling_profiler(argv=None):
+    """--profile / DETECTOR_PROFILE=1 이면 바로 시작하고, SIGUSR1마다 켜기/끄기(끌 때 덤프)를 요청한다."""
+    argv = sys.argv if argv is None else argv
+    sampler = SamplingProfiler()
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: sampler.request_toggle())
+
+    if "--profile" in argv or os.getenv("DETECTOR_PROFILE") == "1":
+        sampler.start()
+    return sampler
+
+
+def finish_sampling_profiler(sampler):
+    if sampler.running:
+        sampler.stop()
+        sampler.dump()
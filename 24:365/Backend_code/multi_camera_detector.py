@@ -0,0 +1,228 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import requests
+from ultralytics import YOLO
+
+from app.frame_bus import SOURCE_PREFIX, open_capture, start_capture_process
+from batch_scheduler import MAX_BATCH_SIZE, SCHEDULING_MODE, BatchScheduler
+from detector_profiler import StageProfiler, StatsReporter, finish_sampling_profiler, setup_sampling_profiler
+from yolo_detector import AI_SERVER_ID, FASTAPI_ENDPOINT, SUBMISSION_INTERVAL, build_payload, process_results
+
+MODEL_PATH = 'best24365.pt'
+CAMERA_CONFIG_PATH = os.getenv("CAMERA_CONFIG", "cameras.json")
+
+# source: 카메라 인덱스/URL 또는 프레임 버스("shm://<camera_id>")
+# camera_id: 결과를 돌려보낼 때 쓰는 ID / fps: 카메라별 목표 추론 FPS / priority: 클수록 먼저 배치에 포함
+# capture: true 이면 source를 별도 캡처 프로세스가 디코딩해 프레임 버스("shm://<camera_id>")에 올리고,
+#          감지기와 웹 서버(CAMERA_SOURCE=shm://<camera_id>)가 같은 디코딩 결과를 함께 읽는다
+DEFAULT_CAMERAS = [
+    {"camera_id": "0", "source": 0, "fps": 5, "priority": 1},
+]
+
+INFERENCE_CONF = 0.5
+CAPTURE_START_TIMEOUT = 10.0
+CAPTURE_CHECK_INTERVAL = 5.0
+PRIORITY_SUBMIT_ATTEMPTS = 5
+
+
+def load_camera_config():
+    if os.path.exists(CAMERA_CONFIG_PATH):
+        with open(CAMERA_CONFIG_PATH, "r") as f:
+            return json.load(f)
+    return DEFAULT_CAMERAS
+
+
+class CameraReader:
+    def __init__(self, camera_id, source, fps=5, priority=1, open_timeout=0.0):
+        self.camera_id = str(camera_id)
+        self.source = source
+        self.interval = 1.0 / fps if fps and fps > 0 else 0.0
+        self.priority = priority
+        self.next_due = 0.0
+
+        self.lock = threading.Lock()
+        self.frame = None
+        self.frame_seq = 0
+        self.last_used_seq = 0
+        self.read_time = 0.0
+        self.stopped = False
+
+        self.stream = open_capture(source, open_timeout)
+        if not self.stream.isOpened():
+            print(f"🚨🚨 Camera {self.camera_id} ({source}) failed to open.")
+            self.stream = None
+            return
+
+        self.thread = threading.Thread(target=self.update, daemon=True)
+        self.thread.start()
+
+    def update(self):
+        while not self.stopped:
+            start = time.perf_counter()
+            grabbed, frame = self.stream.read()
+            if not grabbed:
+                time.sleep(0.1)
+                continue
+            with self.lock:
+                self.frame = frame
+                self.frame_seq += 1
+                self.read_time = time.perf_counter() - start
+
+        self.stream.release()
+
+    def has_new_frame(self):
+        return self.frame_seq != self.last_used_seq
+
+    def take_frame(self):
+        """(프레임, 직전 추론 이후 추론 없이 지나간 프레임 수, 이 프레임을 읽는 데 걸린 초)"""
+        with self.lock:
+            skipped = max(0, self.frame_seq - self.last_used_seq - 1) if self.last_used_seq else 0
+            self.last_used_seq = self.frame_seq
+            return self.frame, skipped, self.read_time
+
+    def stop(self):
+        self.stopped = True
+
+
+def is_priority_payload(payload):
+    return bool(payload.get("is_fire_detected") or payload.get("is_smoke_detected"))
+
+
+def submission_worker(submit_queue, profiler):
+    """큐의 (payload, 시도 횟수)를 서버로 보낸다."""
+    session = requests.Session()
+    while True:
+        payload, attempt = submit_queue.get()
+        try:
+            with profiler.stage("submit"):
+                response = session.post(FASTAPI_ENDPOINT, json=payload, timeout=2)
+            if response.status_code == 429:
+                # 서버가 과부하면 알려준 시간만큼 쉰다. 화재/연기 결과는 다시 큐에 넣고, 일반 결과는 버린다
+                retry_after = float(response.headers.get("Retry-After", 1))
+                camera_id = payload.get("camera_id")
+                if is_priority_payload(payload) and attempt + 1 < PRIORITY_SUBMIT_ATTEMPTS:
+                    try:
+                        submit_queue.put_nowait((payload, attempt + 1))
+                        print(f"⏳ 서버 과부하(429): 카메라 {camera_id} 화재/연기 결과를 {retry_after:.0f}초 뒤 다시 전송합니다.")
+                    except queue.Full:
+                        print(f"⚠️ 서버 과부하(429)이고 전송 대기열도 가득 차 카메라 {camera_id} 화재/연기 결과를 버립니다.")
+                elif is_priority_payload(payload):
+                    print(f"⚠️ 서버 과부하(429): 카메라 {camera_id} 화재/연기 결과를 {PRIORITY_SUBMIT_ATTEMPTS}번 시도했지만 보내지 못해 버립니다.")
+                else:
+                    print(f"⏳ 서버 과부하(429): 카메라 {camera_id} 일반 결과를 버리고 {retry_after:.0f}초 쉽니다.")
+                time.sleep(retry_after)
+            elif response.status_code not in [200, 201]:
+                print(f"❌ FAILURE: 카메라 {payload.get('camera_id')} 전송 실패! 코드: {response.status_code}")
+        except requests.exceptions.ConnectionError:
+            print("🚨 CONNECTION FAILED: FastAPI 서버 연결 안 됨! 서버(main.py)가 켜져 있는지 확인하세요.")
+        except requests.exceptions.Timeout:
+            print("⏳ TIMEOUT: 서버 응답 지연.")
+
+
+def start_captures(configs):
+    """capture: true 인 카메라마다 캡처 프로세스를 띄운다. {camera_id: (source, process)}"""
+    captures = {}
+    for c in configs:
+        if c.get("capture"):
+            camera_id = str(c["camera_id"])
+            captures[camera_id] = (c["source"], start_capture_process(camera_id, c["source"]))
+    return captures
+
+
+def restart_dead_captures(captures):
+    for camera_id, (source, process) in list(captures.items()):
+        if not process.is_alive():
+            # 새 캡처 프로세스는 새 버퍼를 만들고, CameraReader의 프레임 버스 리더가 알아서 다시 붙는다
+            print(f"⚠️ 카메라 {camera_id} 캡처 프로세스가 종료되어(코드 {process.exitcode}) 다시 시작합니다.")
+            captures[camera_id] = (source, start_capture_process(camera_id, source))
+
+
+def run(sampler=None):
+    model = YOLO(MODEL_PATH)
+
+    configs = load_camera_config()
+    captures = start_captures(configs)
+    cameras = [
+        CameraReader(
+            c["camera_id"],
+            f"{SOURCE_PREFIX}{c['camera_id']}" if c.get("capture") else c["source"],
+            c.get("fps", 5),
+            c.get("priority", 1),
+            CAPTURE_START_TIMEOUT if c.get("capture") else 0.0,
+        )
+        for c in configs
+    ]
+    cameras = [cam for cam in cameras if cam.stream is not None]
+    if not cameras:
+        print("❌ 열 수 있는 카메라가 없습니다. 종료합니다.")
+        return
+
+    print(f"✅ {len(cameras)}개 카메라, 모델 1개로 배치 추론 시작 (모드: {SCHEDULING_MODE}, 최대 배치: {MAX_BATCH_SIZE})")
+
+    profiler = StageProfiler(AI_SERVER_ID, f"{len(cameras)} cameras")
+    reporter = StatsReporter(profiler)
+
+    scheduler = BatchScheduler(cameras)
+    submit_queue = queue.Queue(maxsize=100)
+    threading.Thread(target=submission_worker, args=(submit_queue, profiler), daemon=True).start()
+
+    next_submission_time = {cam.camera_id: 0.0 for cam in cameras}
+    next_capture_check = time.time() + CAPTURE_CHECK_INTERVAL
+
+    while True:
+        reporter.maybe_report()
+        if sampler is not None:
+            sampler.check_toggle()
+        if captures and time.time() >= next_capture_check:
+            restart_dead_captures(captures)
+            next_capture_check = time.time() + CAPTURE_CHECK_INTERVAL
+
+        batch = scheduler.next_batch()
+        if not batch:
+            time.sleep(min(scheduler.wait_time(), 0.05) or 0.005)
+            continue
+
+        frames = []
+        for cam in batch:
+            frame, skipped, read_time = cam.take_frame()
+            frames.append(frame)
+            # 카메라 읽기는 카메라별 스레드에서 하므로 마지막 읽기 시간을 기록한다
+            profiler.record("read", read_time)
+            profiler.frame_dropped(cam.camera_id, skipped)
+
+        start = time.perf_counter()
+        results_list = model.predict(frames, conf=INFERENCE_CONF, verbose=False)
+        predict_time = time.perf_counter() - start
+        profiler.record("predict", predict_time)
+        profiler.record("predict_per_frame", predict_time / len(frames))
+
+        current_time = time.time()
+        for cam, results in zip(batch, results_list):
+            profiler.frame_done(cam.camera_id)
+            if current_time < next_submission_time[cam.camera_id]:
+                continue
+
+            with profiler.stage("process"):
+                detection_details, is_fire, is_smoke = process_results(results, model.names)
+
+            payload = build_payload(detection_details, is_fire, is_smoke, camera_id=cam.camera_id)
+            try:
+                submit_queue.put_nowait((payload, 0))
+            except queue.Full:
+                print(f"⚠️ 전송 대기열이 가득 차 카메라 {cam.camera_id} 결과를 버립니다.")
+            next_submission_time[cam.camera_id] = current_time + SUBMISSION_INTERVAL
+
+
+if __name__ == "__main__":
+    print("--- 🔥 멀티 카메라 배치 감지 시작 ---")
+    sampler = setup_sampling_profiler()
+    try:
+        run(sampler)
+    except KeyboardInterrupt:
+        print("종료합니다.")
+    finally:
+        finish_sampling_profiler(sampler)
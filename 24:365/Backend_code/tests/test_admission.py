@@ -0,0 +1,61 @@
+import pytest
+
+from app import admission as admission_module
+from app.admission import OVERLOAD_RETRY_AFTER, AdmissionController, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_reports_wait():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_burst():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.updated
+    for _ in range(3):
+        bucket.take(now)
+    assert bucket.take(now + 0.5) == 0.0
+    bucket.take(now + 100)
+    assert bucket.tokens == pytest.approx(2)
+
+
+@pytest.fixture
+def small_buckets(monkeypatch):
+    monkeypatch.setattr(admission_module, "ADMISSION_RATE", 1)
+    monkeypatch.setattr(admission_module, "ADMISSION_BURST", 2)
+    monkeypatch.setattr(admission_module, "PRIORITY_RATE", 1)
+    monkeypatch.setattr(admission_module, "PRIORITY_BURST", 4)
+
+
+def test_rate_limit_is_per_source_and_per_class(small_buckets):
+    controller = AdmissionController(max_in_flight=100)
+    assert controller.admit("a") == (True, 0)
+    assert controller.admit("a") == (True, 0)
+    allowed, retry_after = controller.admit("a")
+    assert not allowed and retry_after >= 1
+
+    # 다른 감지 서버와 화재/연기 이벤트는 각자 버킷을 쓴다
+    assert controller.admit("b") == (True, 0)
+    assert controller.admit("a", priority=True) == (True, 0)
+
+    counters = controller.stats()["sources"]["a"]
+    assert counters["accepted"] == 2
+    assert counters["accepted_priority"] == 1
+    assert counters["rejected_rate"] == 1
+
+
+def test_in_flight_limit_reserves_room_for_priority(small_buckets):
+    controller = AdmissionController(max_in_flight=4)
+    assert controller.routine_in_flight == 3
+    for source in ("a", "b", "c"):
+        assert controller.admit(source)[0]
+
+    assert controller.admit("d") == (False, OVERLOAD_RETRY_AFTER)
+    assert controller.admit("d", priority=True) == (True, 0)
+    assert controller.admit("e", priority=True) == (False, OVERLOAD_RETRY_AFTER)
+
+    controller.release()
+    assert controller.admit("e", priority=True) == (True, 0)
+    assert controller.stats()["in_flight"] == 4
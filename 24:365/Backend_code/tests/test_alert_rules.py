@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+
+from app.alert_rules import AlertEngine, KOfNRule, MultiCameraRule, load_rules
+
+START = datetime(2025, 3, 14, 10, 0, 0)
+
+
+def event(class_name="FIRE", confidence=0.9, camera_id="1", seconds=0):
+    return {
+        "class_name": class_name,
+        "confidence": confidence,
+        "camera_id": camera_id,
+        "timestamp": (START + timedelta(seconds=seconds)).isoformat(),
+    }
+
+
+def k_of_n(k=2, n=3):
+    return KOfNRule({"name": "fire", "class_name": "FIRE", "min_confidence": 0.5, "k": k, "n": n})
+
+
+def multi_camera(cameras=2, window=60):
+    return MultiCameraRule({"name": "smoke", "class_name": "SMOKE", "cameras": cameras, "window": window})
+
+
+def test_k_of_n_fires_on_kth_hit_in_window():
+    rule = k_of_n(k=2, n=3)
+    assert rule.evaluate(event()) is None
+    alert = rule.evaluate(event())
+    assert alert["rule"] == "fire"
+    assert alert["camera_id"] == "1"
+    assert alert["count"] == 2
+
+
+def test_k_of_n_forgets_hits_that_leave_window():
+    rule = k_of_n(k=2, n=3)
+    rule.evaluate(event())
+    rule.evaluate(event(confidence=0.1))
+    rule.evaluate(event(class_name="SMOKE"))
+    # 첫 감지는 창에서 밀려났으므로 다시 한 번만 센다
+    assert rule.evaluate(event()) is None
+    assert rule.windows["1"][1] == 1
+
+
+def test_k_of_n_counts_cameras_separately():
+    rule = k_of_n(k=2, n=3)
+    assert rule.evaluate(event(camera_id="1")) is None
+    assert rule.evaluate(event(camera_id="2")) is None
+    assert rule.evaluate(event(camera_id="2")) is not None
+
+
+def test_k_of_n_does_not_alert_on_miss():
+    rule = k_of_n(k=1, n=1)
+    assert rule.evaluate(event(confidence=0.2)) is None
+
+
+def test_multi_camera_alerts_when_enough_cameras_in_window():
+    rule = multi_camera(cameras=2, window=60)
+    assert rule.evaluate(event("SMOKE", camera_id="1", seconds=0)) is None
+    alert = rule.evaluate(event("SMOKE", camera_id="2", seconds=30))
+    assert alert["cameras"] == ["1", "2"]
+
+
+def test_multi_camera_prunes_cameras_outside_window():
+    rule = multi_camera(cameras=2, window=60)
+    rule.evaluate(event("SMOKE", camera_id="1", seconds=0))
+    assert rule.evaluate(event("SMOKE", camera_id="2", seconds=120)) is None
+    assert list(rule.last_seen) == ["2"]
+
+
+def test_multi_camera_handles_out_of_order_events():
+    rule = multi_camera(cameras=2, window=60)
+    rule.evaluate(event("SMOKE", camera_id="1", seconds=120))
+    # 늦게 도착한 오래된 이벤트는 창 밖이므로 경보가 나지 않고 바로 지워진다
+    assert rule.evaluate(event("SMOKE", camera_id="2", seconds=0)) is None
+    assert list(rule.last_seen) == ["1"]
+    assert rule.evaluate(event("SMOKE", camera_id="2", seconds=100)) is not None
+
+
+def test_load_rules_skips_invalid_specs(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(
+        '[{"name": "ok", "type": "k_of_n", "k": 1, "n": 2},'
+        ' {"name": "bad_k", "type": "k_of_n", "k": 3, "n": 2},'
+        ' {"name": "missing", "type": "multi_camera"},'
+        ' {"name": "unknown", "type": "nope"}]'
+    )
+    rules = load_rules(str(path))
+    assert [rule.name for rule in rules] == ["ok"]
+
+
+def test_engine_returns_matching_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text('[{"name": "fire", "type": "k_of_n", "class_name": "FIRE", "k": 1, "n": 1}]')
+    engine = AlertEngine()
+    assert engine.evaluate(event()) == []
+    assert engine.load(str(path)) == 1
+
+    alerts = engine.evaluate(event())
+    assert [(rule.name, alert["rule"]) for rule, alert in alerts] == [("fire", "fire")]
+
+
+def test_multi_camera_keeps_camera_with_newer_hit():
+    rule = multi_camera(cameras=2, window=60)
+    rule.evaluate(event("SMOKE", camera_id="1", seconds=0))
+    rule.evaluate(event("SMOKE", camera_id="1", seconds=50))
+    # 0초 감지는 창 밖이지만 카메라 1은 50초에 다시 감지했으므로 남아 있어야 한다
+    assert rule.evaluate(event("SMOKE", camera_id="2", seconds=100)) is not None
+    assert len(rule.hits) == 2
+
+
+def test_multi_camera_matches_full_scan():
+    import random
+
+    rng = random.Random(7)
+    rule = multi_camera(cameras=3, window=30)
+    latest = {}
+    clock = 0.0
+    for _ in range(2000):
+        camera_id = str(rng.randrange(6))
+        clock += rng.uniform(0, 3)
+        # 가끔 늦게 도착한 이벤트(창 안일 수도, 밖일 수도 있음)를 섞는다
+        seconds = clock - rng.uniform(0, 60) if rng.random() < 0.2 else clock
+        alert = rule.evaluate(event("SMOKE", camera_id=camera_id, seconds=seconds))
+
+        latest[camera_id] = max(seconds, latest.get(camera_id, seconds))
+        newest = max(latest.values())
+        latest = {cam: seen for cam, seen in latest.items() if seen >= newest - 30}
+        expected = camera_id in latest and len(latest) >= 3
+        assert (alert is not None) == expected
+        assert set(rule.last_seen) == set(latest)
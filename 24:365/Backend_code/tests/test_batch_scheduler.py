@@ -0,0 +1,60 @@
+import time
+
+from batch_scheduler import BatchScheduler
+
+
+class FakeCamera:
+    def __init__(self, camera_id, interval=1.0, priority=1, next_due=0.0, has_frame=True):
+        self.camera_id = camera_id
+        self.interval = interval
+        self.priority = priority
+        self.next_due = next_due
+        self.has_frame = has_frame
+
+    def has_new_frame(self):
+        return self.has_frame
+
+
+def ids(batch):
+    return [cam.camera_id for cam in batch]
+
+
+def make_due(cameras):
+    for cam in cameras:
+        cam.next_due = 0.0
+
+
+def test_round_robin_continues_after_last_batch():
+    cameras = [FakeCamera(str(i)) for i in range(5)]
+    scheduler = BatchScheduler(cameras, max_batch_size=2, mode="round_robin")
+
+    assert ids(scheduler.next_batch()) == ["0", "1"]
+    make_due(cameras)
+    assert ids(scheduler.next_batch()) == ["2", "3"]
+    make_due(cameras)
+    assert ids(scheduler.next_batch()) == ["4", "0"]
+
+
+def test_priority_mode_prefers_high_priority():
+    cameras = [FakeCamera("low", priority=1), FakeCamera("high", priority=5), FakeCamera("mid", priority=3)]
+    scheduler = BatchScheduler(cameras, max_batch_size=2, mode="priority")
+    assert ids(scheduler.next_batch()) == ["high", "mid"]
+
+
+def test_skips_cameras_not_due_or_without_new_frame():
+    later = time.time() + 60
+    cameras = [FakeCamera("waiting", next_due=later), FakeCamera("stale", has_frame=False), FakeCamera("ready")]
+    scheduler = BatchScheduler(cameras, max_batch_size=8)
+    assert ids(scheduler.next_batch()) == ["ready"]
+
+
+def test_late_camera_is_rescheduled_from_now():
+    cam = FakeCamera("0", interval=0.5, next_due=time.time() - 100)
+    scheduler = BatchScheduler([cam])
+
+    before = time.time()
+    assert ids(scheduler.next_batch()) == ["0"]
+    # 밀린 주기를 몰아서 처리하지 않도록 지금부터 한 주기 뒤로 맞춘다
+    assert cam.next_due >= before + 0.5
+    assert scheduler.next_batch() == []
+    assert 0.0 < scheduler.wait_time() <= 0.5
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app.clip_recorder import RangeNotSatisfiable, parse_range_header
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-200", (800, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_valid_ranges(header, expected):
+    assert parse_range_header(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [
+    "bytes=-",
+    "bytes=50-10",
+    "bytes=0-10,20-30",
+    "items=0-10",
+    "bytes=a-b",
+])
+def test_malformed_ranges_are_ignored(header):
+    # 형식이 틀린 Range는 무시하고 전체를 보낸다 (200)
+    assert parse_range_header(header, 1000) is None
+
+
+@pytest.mark.parametrize("header, file_size", [
+    ("bytes=1000-", 1000),
+    ("bytes=1000-2000", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=0-", 0),
+])
+def test_unsatisfiable_ranges(header, file_size):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range_header(header, file_size)
@@ -0,0 +1,225 @@
+import io
+import socket
+import threading
+import time
+
+import pytest
+
+from app.event_bus import (
+    InProcessBus, RespError, RespEventBus, create_event_bus, encode_array, encode_bulk, encode_command,
+    encode_error, encode_int, encode_simple, read_reply,
+)
+
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def decode(data):
+    return read_reply(io.BytesIO(data))
+
+
+def test_encode_command_as_bulk_string_array():
+    assert encode_command("PUBLISH", "detections", 42) == b"*3\r\n$7\r\nPUBLISH\r\n$10\r\ndetections\r\n$2\r\n42\r\n"
+    assert decode(encode_command("SET", "화재", b"a\r\nb")) == [b"SET", "화재".encode("utf-8"), b"a\r\nb"]
+
+
+def test_reply_round_trip():
+    assert decode(encode_simple("OK")) == "OK"
+    assert decode(encode_int(-7)) == -7
+    assert decode(encode_bulk(b"")) == b""
+    assert decode(encode_bulk(None)) is None
+    assert decode(encode_array([encode_bulk(b"message"), encode_int(1), encode_array([])])) == [b"message", 1, []]
+    assert decode(b"*-1\r\n") is None
+
+
+def test_read_reply_consumes_one_reply_at_a_time():
+    f = io.BytesIO(encode_int(1) + encode_bulk(b"two"))
+    assert read_reply(f) == 1
+    assert read_reply(f) == b"two"
+    with pytest.raises(ConnectionError):
+        read_reply(f)
+
+
+def test_read_reply_errors():
+    with pytest.raises(RespError, match="ERR unknown command"):
+        decode(encode_error("ERR unknown command"))
+    with pytest.raises(RespError):
+        decode(b"?what\r\n")
+
+
+@pytest.fixture
+def bus_url(tmp_path):
+    return f"unix://{tmp_path}/bus.sock"
+
+
+@pytest.fixture
+def buses(bus_url):
+    created = []
+
+    def make(**kwargs):
+        bus = RespEventBus(bus_url, **kwargs)
+        created.append(bus)
+        return bus
+
+    yield make
+    for bus in reversed(created):
+        bus.close()
+
+
+def test_publish_reaches_other_bus_instance(buses):
+    first, second = buses(), buses()
+    assert first.broker_server is not None
+    assert second.broker_server is None
+
+    received = []
+    second.subscribe("detections", lambda message, data: received.append(message))
+    second.start()
+    assert wait_for(lambda: second.subscribers and first.command("PUBLISH", "detections", "ping") == 1)
+
+    first.publish("detections", "1\tcam\t{}")
+    assert wait_for(lambda: "1\tcam\t{}" in received)
+
+
+def test_callback_can_issue_commands(buses):
+    bus = buses()
+    seen = []
+
+    # 콜백이 같은 버스에 명령을 보내는 동안 다른 스레드가 큰 메시지를 계속 게시해도 막히지 않아야 한다
+    def on_message(message, data):
+        seen.append(bus.incr("callback:count"))
+
+    bus.subscribe("detections", on_message)
+    bus.start()
+    assert wait_for(lambda: bus.command("PUBLISH", "detections", "ping") == 1)
+
+    message = "x" * 256 * 1024
+    threads = [threading.Thread(target=bus.publish, args=("detections", message)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert wait_for(lambda: len(seen) >= 9)
+
+
+def test_acquire_is_exclusive_until_expiry(buses):
+    first, second = buses(), buses()
+    assert first.acquire("dedup:a", 0.2)
+    assert not second.acquire("dedup:a", 0.2)
+    time.sleep(0.3)
+    assert second.acquire("dedup:a", 0.2)
+
+
+def test_incr_is_shared(buses):
+    first, second = buses(), buses()
+    assert [first.incr("detections:seq"), second.incr("detections:seq"), first.incr("detections:seq")] == [1, 2, 3]
+
+
+def test_counter_seeds_apply_to_new_broker(buses):
+    bus = buses(counter_seeds=lambda: {"detections:seq": 41})
+    assert bus.incr("detections:seq") == 42
+
+
+def test_unreachable_bus_falls_back_to_in_process():
+    bus = create_event_bus("redis://127.0.0.1:1", counter_seeds=lambda: {"detections:seq": 41})
+    assert isinstance(bus, InProcessBus)
+
+    received = []
+    bus.subscribe("detections", lambda message, data: received.append(message))
+    bus.publish("detections", "x")
+    assert received == ["x"]
+    assert bus.incr("detections:seq") == 42
+
+
+def test_in_process_delivery_passes_original_object():
+    bus = InProcessBus()
+    received = []
+    bus.subscribe("detections", lambda message, data: received.append((message, data)))
+
+    event = {"class_name": "FIRE"}
+    bus.publish("detections", '{"class_name": "FIRE"}', event)
+    assert received[0][1] is event
+
+
+def test_bus_delivery_has_no_original_object(buses):
+    bus = buses()
+    received = []
+    bus.subscribe("detections", lambda message, data: received.append((message, data)))
+    bus.start()
+    assert wait_for(lambda: bus.command("PUBLISH", "detections", "ping") == 1)
+
+    bus.publish("detections", "x", {"not": "sent"})
+    assert wait_for(lambda: ("x", None) in received)
+
+
+def test_commands_fall_back_when_broker_goes_away(buses, monkeypatch):
+    bus = buses()
+    received = []
+    bus.subscribe("detections", lambda message, data: received.append(message))
+
+    def unreachable():
+        raise ConnectionRefusedError("broker down")
+
+    assert [bus.incr("detections:seq"), bus.incr("detections:seq")] == [1, 2]
+
+    bus.conn.close()
+    bus.conn = None
+    monkeypatch.setattr(bus, "connect", unreachable)
+
+    bus.publish("detections", "local")
+    assert received == ["local"]
+    assert bus.acquire("dedup:b", 10)
+    assert not bus.acquire("dedup:b", 10)
+    # 대신 쓰는 카운터도 버스에서 받은 마지막 값 뒤에서 이어서 센다
+    assert [bus.incr("detections:seq"), bus.incr("detections:seq")] == [3, 4]
+
+
+def test_fallback_counter_starts_from_seed(buses, monkeypatch):
+    seq = {"detections:seq": 0}
+    bus = buses(counter_seeds=lambda: dict(seq))
+    seq["detections:seq"] = 500
+
+    def unreachable():
+        raise ConnectionRefusedError("broker down")
+
+    bus.conn.close()
+    bus.conn = None
+    monkeypatch.setattr(bus, "connect", unreachable)
+    assert bus.incr("detections:seq") == 501
+
+
+def test_command_is_not_resent_after_reply_timeout(buses, monkeypatch):
+    bus = buses()
+    sent = []
+    original_send = bus.conn.send
+
+    def send(*args):
+        sent.append(args)
+        original_send(*args)
+
+    class SlowReply:
+        def readline(self):
+            raise TimeoutError("timed out")
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(bus.conn, "send", send)
+    monkeypatch.setattr(bus.conn, "file", SlowReply())
+    with pytest.raises(TimeoutError):
+        bus.command("INCR", "detections:seq")
+    assert sent == [("INCR", "detections:seq")]
+
+
+def test_stale_connection_is_replaced_before_sending(buses):
+    bus = buses()
+    stale = bus.conn
+    stale.sock.shutdown(socket.SHUT_RDWR)
+    assert bus.incr("detections:seq") == 1
+    assert bus.conn is not stale
@@ -0,0 +1,43 @@
+from app.event_ring import SEQ_RESET_GAP, RecentEvents
+
+
+def test_since_merges_cameras_in_seq_order():
+    events = RecentEvents()
+    events.append(1, "a", "a1")
+    events.append(3, "a", "a3")
+    events.append(2, "b", "b2")
+    events.append(4, None, "d4")
+
+    assert events.since(0) == ["a1", "b2", "a3", "d4"]
+    assert events.since(2) == ["a3", "d4"]
+    assert events.since(4) == []
+
+
+def test_ring_keeps_latest_events_per_camera():
+    events = RecentEvents(events_per_camera=2)
+    for seq in range(1, 5):
+        events.append(seq, "a", f"a{seq}")
+    events.append(5, "b", "b5")
+
+    assert events.since(0) == ["a3", "a4", "b5"]
+    assert events.latest(2) == ["a4", "b5"]
+    assert events.latest(0) == []
+
+
+def test_small_seq_reorder_is_kept():
+    events = RecentEvents()
+    events.append(10, "a", "a10")
+    events.append(9, "b", "b9")
+
+    assert events.seq == 10
+    assert events.since(0) == ["b9", "a10"]
+
+
+def test_counter_restart_clears_rings():
+    events = RecentEvents()
+    old_seq = SEQ_RESET_GAP * 3
+    events.append(old_seq, "a", "old")
+    events.append(1, "a", "new")
+
+    assert events.seq == 1
+    assert events.since(0) == ["new"]
@@ -0,0 +1,87 @@
+import os
+import struct
+import uuid
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app.frame_bus import BUS_HEADER, SLOT_HEADER, FrameBusReader, FrameBusWriter, SharedFrameCapture
+
+
+@pytest.fixture
+def camera_id():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def frame_of(value, shape=(4, 6, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+def test_read_returns_copy_of_latest_frame(camera_id):
+    writer = FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+    reader = FrameBusReader(camera_id)
+    try:
+        writer.publish(frame_of(1))
+        seq, _, frame = reader.read()
+        assert seq == 1 and (frame == 1).all()
+
+        # 쓰는 쪽이 링을 한 바퀴 돌아도 이미 읽은 프레임은 바뀌지 않는다
+        writer.publish(frame_of(2))
+        writer.publish(frame_of(3))
+        assert (frame == 1).all()
+        assert reader.read(1) == (0, 0.0, None)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_read_discards_slot_overwritten_during_copy(camera_id, monkeypatch):
+    writer = FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+    reader = FrameBusReader(camera_id)
+    try:
+        writer.publish(frame_of(1))
+        offset = BUS_HEADER.size + (1 % reader.slots) * reader.slot_size
+        # 복사 직후 쓰는 쪽이 같은 슬롯을 쓰기 시작한 상황
+        monkeypatch.setattr(reader, "is_current", lambda seq: SLOT_HEADER.pack_into(reader.shm.buf, offset, 0, 0.0))
+        assert reader.read(1) == (0, 0.0, None)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_writer_refuses_segment_of_live_writer(camera_id):
+    writer = FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+    try:
+        # 살아 있는 다른 프로세스(여기서는 부모 프로세스)가 쓰는 버퍼인 것처럼 만든다
+        struct.pack_into("<I", writer.shm.buf, 24, os.getppid())
+        with pytest.raises(RuntimeError):
+            FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+    finally:
+        writer.close()
+
+
+def test_capture_reattaches_after_writer_restart(camera_id):
+    writer = FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+    capture = SharedFrameCapture(camera_id, timeout=0.05)
+    try:
+        writer.publish(frame_of(1))
+        grabbed, frame = capture.read()
+        assert grabbed and (frame == 1).all()
+
+        writer.close()
+        writer = FrameBusWriter(camera_id, (4, 6, 3), slots=2)
+        writer.publish(frame_of(7))
+
+        assert capture.read() == (False, None)
+        grabbed, frame = capture.read()
+        assert grabbed and (frame == 7).all()
+    finally:
+        capture.release()
+        writer.close()
+
+
+def test_missing_bus_is_not_opened():
+    capture = SharedFrameCapture(f"missing-{uuid.uuid4().hex[:8]}", timeout=0.01)
+    assert not capture.isOpened()
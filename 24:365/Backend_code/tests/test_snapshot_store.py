@@ -0,0 +1,56 @@
+import hashlib
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from app import snapshot_store
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_store, "SNAPSHOT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def frame_with_box(value):
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[40:80, 60:100] = value
+    return frame
+
+
+DETECTION = {"location_x": 0.5, "location_y": 0.5, "box_w": 0.25, "box_h": 0.33}
+
+
+def stored_files(root):
+    return [os.path.join(d, f) for d, _, files in os.walk(root) for f in files]
+
+
+def test_same_crop_is_stored_once(snapshot_dir):
+    first = snapshot_store.store_snapshot(frame_with_box(200), DETECTION)
+    second = snapshot_store.store_snapshot(frame_with_box(200), DETECTION)
+
+    assert first == second
+    assert stored_files(snapshot_dir) == [snapshot_store.snapshot_path(first)]
+
+
+def test_hash_is_name_of_content(snapshot_dir):
+    snapshot_hash = snapshot_store.store_snapshot(frame_with_box(200), DETECTION)
+    content = snapshot_store.read_snapshot(snapshot_hash)
+
+    assert hashlib.sha256(content).hexdigest() == snapshot_hash
+    assert snapshot_store.snapshot_path(snapshot_hash).endswith(os.path.join(snapshot_hash[:2], snapshot_hash + ".jpg"))
+
+
+def test_different_crops_get_different_hashes():
+    assert snapshot_store.store_snapshot(frame_with_box(200), DETECTION) != \
+        snapshot_store.store_snapshot(frame_with_box(90), DETECTION)
+
+
+def test_unknown_or_malformed_hash_is_missing():
+    assert snapshot_store.read_snapshot("0" * 64) is None
+    assert not snapshot_store.snapshot_exists("0" * 64)
+    assert snapshot_store.snapshot_path("../../etc/passwd") is None
+    assert not snapshot_store.snapshot_exists("not-a-hash")
@@ -0,0 +1,46 @@
+import struct
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.video_codec import BoxSplitter
+
+
+def box(box_type, payload):
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+
+def large_box(box_type, payload):
+    return struct.pack(">I", 1) + box_type + struct.pack(">Q", 16 + len(payload)) + payload
+
+
+def split(*writes):
+    boxes = []
+    splitter = BoxSplitter(lambda box_type, data: boxes.append((box_type, data)))
+    for data in writes:
+        assert splitter.write(data) == len(data)
+    return boxes, splitter
+
+
+def test_splits_boxes_written_together():
+    ftyp, moov = box(b"ftyp", b"isom"), box(b"moov", b"x" * 20)
+    boxes, splitter = split(ftyp + moov)
+    assert boxes == [(b"ftyp", ftyp), (b"moov", moov)]
+    assert splitter.buffer == b""
+
+
+def test_waits_for_box_split_across_writes():
+    moof = box(b"moof", b"y" * 30)
+    boxes, splitter = split(moof[:3], moof[3:12], moof[12:])
+    assert boxes == [(b"moof", moof)]
+
+    boxes, splitter = split(moof[:12])
+    assert boxes == []
+    assert splitter.buffer == moof[:12]
+
+
+def test_handles_64bit_box_size():
+    mdat = large_box(b"mdat", b"z" * 40)
+    boxes, _ = split(mdat[:10], mdat[10:])
+    assert boxes == [(b"mdat", mdat)]
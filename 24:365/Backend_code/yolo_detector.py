@@ -8,6 +8,9 @@ import os
 import random 
 import numpy as np
 
+from app.frame_bus import open_capture, parse_source
+from detector_profiler import StageProfiler, StatsReporter, finish_sampling_profiler, setup_sampling_profiler
+
 FASTAPI_ENDPOINT = "http://127.0.0.1:9000/detections/" 
 AI_SERVER_ID = "24/365" 
 
@@ -18,6 +21,93 @@ SUBMISSION_INTERVAL = 10
 next_submission_time = time.time() + SUBMISSION_INTERVAL 
 
 
+def process_results(results, names):
+    is_fire_detected_in_frame = False
+    is_smoke_detected_in_frame = False
+    detection_details = []
+    
+    boxes = results.boxes.cpu().numpy()
+
+    for box in boxes:
+        
+        cls_name = "unknown"
+        conf = 0.0
+        x_center, y_center, w, h = 0.0, 0.0, 0.0, 0.0
+
+        if hasattr(box, 'cls') and hasattr(box.cls, 'size') and box.cls.size > 0:
+            cls_id = int(box.cls[0])
+            cls_name = names.get(cls_id, "unknown")
+            conf = float(box.conf[0])
+            x_center, y_center, w, h = box.xywhn[0]
+        
+        elif hasattr(box, 'conf'):
+            cls_id = int(box.cls[0])
+            cls_name = results.names.get(cls_id, "unknown")
+            conf = float(box.conf[0])
+            x_center, y_center, w, h = box.xywhn[0]
+        
+        else:
+            continue 
+
+        normalized_cls_name = cls_name.lower()
+
+        is_fire_flag = normalized_cls_name in FIRE_CLASS_NAMES
+        is_smoke_flag = normalized_cls_name in SMOKE_CLASS_NAMES
+
+        if is_fire_flag:
+            is_fire_detected_in_frame = True
+        
+        if is_smoke_flag:
+            is_smoke_detected_in_frame = True
+        
+        detection_details.append({
+            "object_type": cls_name,
+            "confidence": round(conf, 4),
+            "location_x": round(float(x_center), 4),
+            "location_y": round(float(y_center), 4),
+            "box_w": round(float(w), 4),
+            "box_h": round(float(h), 4),
+        })
+
+    return detection_details, is_fire_detected_in_frame, is_smoke_detected_in_frame
+
+
+def build_payload(detection_details, is_fire_detected_in_frame, is_smoke_detected_in_frame, camera_id=None):
+    if len(detection_details) > 0:
+        first_detection = detection_details[0]
+        payload_compatible = {
+            "ai_server_id": AI_SERVER_ID,
+            "object_type": first_detection['object_type'], 
+            "confidence": first_detection['confidence'],
+            "location_x": first_detection['location_x'], 
+            "location_y": first_detection['location_y'], 
+            "box_w": first_detection['box_w'],  
+            "box_h": first_detection['box_h'],
+            "is_fire_detected": is_fire_detected_in_frame, 
+            "is_smoke_detected": is_smoke_detected_in_frame 
+        }
+    else:
+        payload_compatible = {
+            "ai_server_id": AI_SERVER_ID,
+            "object_type": "None", 
+            "confidence": 0.0,
+            "location_x": 0.0, 
+            "location_y": 0.0, 
+            "box_w": 0.0,  
+            "box_h": 0.0,
+            "is_fire_detected": False, 
+            "is_smoke_detected": False 
+        }
+
+    if camera_id is not None:
+        payload_compatible["camera_id"] = str(camera_id)
+    # 서버는 이 주기에 맞춰 영상 위 박스를 다음 결과가 올 때까지 남겨 둔다
+    payload_compatible["submission_interval"] = SUBMISSION_INTERVAL
+
+    return payload_compatible
+
+
+
 if __name__ == "__main__":
     print("--- 🔥 최종 진단 시작: YOLO 감지 상세 로그 확인 ---")
     print(f"--- 🚨 현재 설정된 Fire 클래스 이름: {FIRE_CLASS_NAMES} ---")
@@ -31,7 +121,8 @@ if __name__ == "__main__":
         print(f"❌ YOLO 모델 로드 실패. 파일 경로 ({MODEL_PATH})를 확인하세요.")
         print("💡 모델 파일이 없으므로, 데이터 전송 테스트만 진행합니다.")
 
-    source = 0
+    source = parse_source(os.getenv("DETECTOR_SOURCE", "0"))
+    results_generator = None
     
     if model is None:
         def mock_results_generator():
@@ -70,108 +161,71 @@ if __name__ == "__main__":
         
         results_generator = mock_results_generator()
         model = type('MockModel', (object,), {'names': {0: 'fire', 1: 'smoke', 2: 'person'}})
-    else:
-        results_generator = model.predict(source=source, stream=True, conf=0.5, show=False)
 
+    profiler = StageProfiler(AI_SERVER_ID, source)
+    reporter = StatsReporter(profiler)
+    sampler = setup_sampling_profiler()
 
-    for results in results_generator:
-        
-        is_fire_detected_in_frame = False
-        is_smoke_detected_in_frame = False
-        detection_details = []
-        
-        boxes = results.boxes.cpu().numpy()
-        
-        if len(boxes) == 0:
-            pass
+    if results_generator is None:
+        # 프레임은 직접 읽어서 읽기와 추론 시간을 따로 잰다 (shm:// 이면 캡처 프로세스가 디코딩한 프레임 버스)
+        def capture_results_generator():
+            capture = open_capture(source)
+            skipped = 0
+            while capture.isOpened():
+                with profiler.stage("read"):
+                    grabbed, frame = capture.read()
+                if not grabbed:
+                    if isinstance(capture, cv2.VideoCapture):
+                        break
+                    continue
 
-        for box in boxes:
-            
-            cls_name = "unknown"
-            conf = 0.0
-            x_center, y_center, w, h = 0.0, 0.0, 0.0, 0.0
-
-            if hasattr(box, 'cls') and hasattr(box.cls, 'size') and box.cls.size > 0:
-                cls_id = int(box.cls[0])
-                cls_name = model.names.get(cls_id, "unknown")
-                conf = float(box.conf[0])
-                x_center, y_center, w, h = box.xywhn[0]
-            
-            elif hasattr(box, 'conf'):
-                cls_id = int(box.cls[0])
-                cls_name = results.names.get(cls_id, "unknown")
-                conf = float(box.conf[0])
-                x_center, y_center, w, h = box.xywhn[0]
-            
-            else:
-                continue 
+                # 프레임 버스는 추론이 밀리는 동안 들어온 프레임을 건너뛴다
+                profiler.frame_dropped(count=getattr(capture, "skipped", 0) - skipped)
+                skipped = getattr(capture, "skipped", 0)
 
-            normalized_cls_name = cls_name.lower()
+                with profiler.stage("predict"):
+                    results = model.predict(frame, conf=0.5, verbose=False)[0]
+                yield results
+            capture.release()
 
-            is_fire_flag = normalized_cls_name in FIRE_CLASS_NAMES
-            is_smoke_flag = normalized_cls_name in SMOKE_CLASS_NAMES
+        results_generator = capture_results_generator()
 
-            if is_fire_flag:
-                is_fire_detected_in_frame = True
-            
-            if is_smoke_flag:
-                is_smoke_detected_in_frame = True
+
+    try:
+        for results in results_generator:
             
-            detection_details.append({
-                "object_type": cls_name,
-                "confidence": round(conf, 4),
-                "location_x": round(float(x_center), 4),
-                "location_y": round(float(y_center), 4),
-                "box_w": round(float(w), 4),
-                "box_h": round(float(h), 4),
-            })
-
-        if len(detection_details) > 0:
-            first_detection = detection_details[0]
-            payload_compatible = {
-                "ai_server_id": AI_SERVER_ID,
-                "object_type": first_detection['object_type'], 
-                "confidence": first_detection['confidence'],
-                "location_x": first_detection['location_x'], 
-                "location_y": first_detection['location_y'], 
-                "box_w": first_detection['box_w'],  
-                "box_h": first_detection['box_h'],
-                "is_fire_detected": is_fire_detected_in_frame, 
-                "is_smoke_detected": is_smoke_detected_in_frame 
-            }
-        else:
-             payload_compatible = {
-                "ai_server_id": AI_SERVER_ID,
-                "object_type": "None", 
-                "confidence": 0.0,
-                "location_x": 0.0, 
-                "location_y": 0.0, 
-                "box_w": 0.0,  
-                "box_h": 0.0,
-                "is_fire_detected": False, 
-                "is_smoke_detected": False 
-            }
+            with profiler.stage("process"):
+                detection_details, is_fire_detected_in_frame, is_smoke_detected_in_frame = process_results(results, model.names)
+                payload_compatible = build_payload(detection_details, is_fire_detected_in_frame, is_smoke_detected_in_frame)
+            profiler.frame_done()
 
-        
-        current_time = time.time()
-        
-        if current_time >= next_submission_time:
+            current_time = time.time()
             
-            try:
-                response = requests.post(FASTAPI_ENDPOINT, json=payload_compatible, timeout=2)
+            if current_time >= next_submission_time:
                 
-                if response.status_code in [200, 201]: 
-                    status_text = "🚨 경보" if is_fire_detected_in_frame or is_smoke_detected_in_frame else "🟢 정상"
-                    print(f"\n[10초 전송] ✅ SUCCESS: 프레임 전송 완료. 상태: {status_text} (총 {len(detection_details)}개 객체 감지)")
-                else:
-                    error_details = response.json()
-                    print(f"❌ FAILURE: 프레임 전송 실패! 코드: {response.status_code}")
-                    print(f"   🚨 서버 응답 에러: {error_details}") 
-            except requests.exceptions.ConnectionError:
-                print("🚨 CONNECTION FAILED: FastAPI 서버 연결 안 됨! 서버(main.py)가 켜져 있는지 확인하세요.")
-            except requests.exceptions.Timeout:
-                print("⏳ TIMEOUT: 서버 응답 지연.")
-                
-            next_submission_time = current_time + SUBMISSION_INTERVAL
-        
-        time.sleep(0.05)
\ No newline at end of file
+                try:
+                    with profiler.stage("submit"):
+                        response = requests.post(FASTAPI_ENDPOINT, json=payload_compatible, timeout=2)
+                    
+                    if response.status_code in [200, 201]: 
+                        status_text = "🚨 경보" if is_fire_detected_in_frame or is_smoke_detected_in_frame else "🟢 정상"
+                        print(f"\n[10초 전송] ✅ SUCCESS: 프레임 전송 완료. 상태: {status_text} (총 {len(detection_details)}개 객체 감지)")
+                    else:
+                        error_details = response.json()
+                        print(f"❌ FAILURE: 프레임 전송 실패! 코드: {response.status_code}")
+                        print(f"   🚨 서버 응답 에러: {error_details}") 
+                except requests.exceptions.ConnectionError:
+                    print("🚨 CONNECTION FAILED: FastAPI 서버 연결 안 됨! 서버(main.py)가 켜져 있는지 확인하세요.")
+                except requests.exceptions.Timeout:
+                    print("⏳ TIMEOUT: 서버 응답 지연.")
+                    
+                next_submission_time = current_time + SUBMISSION_INTERVAL
+
+            reporter.maybe_report()
+            sampler.check_toggle()
+            
+            time.sleep(0.05)
+    except KeyboardInterrupt:
+        print("종료합니다.")
+    finally:
+        finish_sampling_profiler(sampler)